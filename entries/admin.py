@@ -1,11 +1,15 @@
-from django.contrib import admin
-from django.db.models import Sum, Count
+from decimal import Decimal
+
+from django import forms
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Sum, Count, OuterRef, Subquery
 from django.utils.html import format_html
-from .models import Entry, AuditLog
+from .models import AUDIT_FIELDS, PAYLOAD_ANNUAL_RATE, audit_state_from_values, Entry, AllEntry, ArchivedEntry, AuditLog, Customer, IdempotencyKey, MaturityAlert, MaturityScan, PortfolioSnapshot
 
 @admin.register(Entry)
 class EntryAdmin(admin.ModelAdmin):
-    list_display = ('serial_number', 'customer_name', 'date', 'amount', 'weight', 'status', 'interest_rate', 'interest_amount', 'total_amount', 'user', 'created_at', 'updated_at')
+    list_display = ('serial_number', 'customer_name', 'date', 'amount', 'weight', 'status', 'interest_rate', 'interest_amount', 'total_amount', 'days_outstanding', 'user', 'created_at', 'updated_at')
     list_filter = ('status', 'date', 'user', 'created_at')
     search_fields = ('serial_number', 'customer_name', 'user__username')
     readonly_fields = ('created_at', 'updated_at', 'total_amount')
@@ -25,17 +29,91 @@ class EntryAdmin(admin.ModelAdmin):
         }),
     )
     ordering = ('-date', '-created_at')
+    actions = ('release_selected', 'record_interest_12', 'record_interest_13_8')
+
+    def _report(self, request, verb, done, skipped):
+        if done:
+            self.message_user(request, f'{len(done)} entries {verb}.', messages.SUCCESS)
+        if skipped:
+            self.message_user(
+                request,
+                f'Skipped entries that are not active: {", ".join(str(pk) for pk in skipped)}',
+                messages.WARNING,
+            )
+
+    @admin.action(description='Release selected active entries')
+    def release_selected(self, request, queryset):
+        pks = list(queryset.values_list('pk', flat=True))
+        released, skipped = Entry.release_many(pks, request.user)
+        self._report(request, 'released', released, skipped)
+
+    def _record_interest(self, request, queryset, annual_rate):
+        pks = list(queryset.values_list('pk', flat=True))
+        updated, skipped = Entry.record_interest_many(
+            pks, Entry.get_daily_rate(annual_rate), None, request.user, annual_rate=Decimal(annual_rate)
+        )
+        self._report(request, f'updated with {annual_rate}% interest', updated, skipped)
+
+    @admin.action(description='Record interest at 12%% until today')
+    def record_interest_12(self, request, queryset):
+        self._record_interest(request, queryset, '12')
+
+    @admin.action(description='Record interest at 13.8%% until today')
+    def record_interest_13_8(self, request, queryset):
+        self._record_interest(request, queryset, '13.8')
+
+    # Admin changes are audited like the views' so portfolio_as_of replays them too
+    def save_model(self, request, obj, form, change):
+        before = None
+        if change:
+            before = audit_state_from_values(Entry.objects.values(*AUDIT_FIELDS).get(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        if change:
+            AuditLog.record(obj, request.user, 'edit', 'Entry edited in admin', before)
+        else:
+            AuditLog.record(obj, request.user, 'create', 'Entry created in admin')
+
+    def _log_deletes(self, request, queryset):
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                entry_id=row['pk'],
+                loan_id=row['pk'],
+                user=request.user,
+                action='delete',
+                details='Entry deleted in admin',
+                payload=AuditLog.build_payload(audit_state_from_values(row), None),
+            )
+            for row in queryset.values('pk', *AUDIT_FIELDS)
+        ])
 
-    def total_amount(self, obj):
-        return obj.amount + (obj.interest_amount or 0)
-    total_amount.short_description = 'Total Amount'
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            self._log_deletes(request, Entry.objects.filter(pk=obj.pk))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            self._log_deletes(request, queryset)
+            super().delete_queryset(request, queryset)
+
+    def get_queryset(self, request):
+        last_interest = AuditLog.objects.filter(
+            entry=OuterRef('pk'), action='calculate_interest'
+        ).order_by('-timestamp').values('timestamp')[:1]
+        return super().get_queryset(request).select_related('user').with_days_outstanding().annotate(
+            last_interest_at=Subquery(last_interest)
+        )
+
+    @admin.display(description='Days Outstanding', ordering='days_outstanding')
+    def days_outstanding(self, obj):
+        return obj.days_outstanding.days
 
     def changelist_view(self, request, extra_context=None):
-        # Get statistics
-        total_entries = Entry.objects.count()
+        # Get statistics, including archived entries
+        total_entries = AllEntry.objects.count()
         active_entries = Entry.objects.filter(status='active').count()
-        released_entries = Entry.objects.filter(status='released').count()
-        total_principal = Entry.objects.aggregate(total=Sum('amount'))['total'] or 0
+        released_entries = AllEntry.objects.filter(status='released').count()
+        total_principal = AllEntry.objects.aggregate(total=Sum('amount'))['total'] or 0
 
         # Add statistics to the context
         extra_context = extra_context or {}
@@ -47,26 +125,114 @@ class EntryAdmin(admin.ModelAdmin):
         return super().changelist_view(request, extra_context=extra_context)
 
     def interest_amount(self, obj):
-        if obj.interest_amount:
-            # Get the latest interest calculation from audit log
-            latest_interest = AuditLog.objects.filter(
-                entry=obj,
-                action='calculate_interest'
-            ).order_by('-timestamp').first()
-            
-            if latest_interest:
-                return format_html(
-                    '<span title="Last calculated on {}">{}</span>',
-                    latest_interest.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    obj.interest_amount
-                )
+        # last_interest_at is the latest calculate_interest audit, annotated in get_queryset
+        if obj.interest_amount and getattr(obj, 'last_interest_at', None):
+            return format_html(
+                '<span title="Last calculated on {}">{}</span>',
+                obj.last_interest_at.strftime('%Y-%m-%d %H:%M:%S'),
+                obj.interest_amount
+            )
         return obj.interest_amount
     interest_amount.short_description = 'Interest Amount'
 
+class CustomerAdminForm(forms.ModelForm):
+    class Meta:
+        model = Customer
+        fields = ('name',)
+
+    def clean_name(self):
+        name = ' '.join(self.cleaned_data['name'].split())
+        key = Customer.normalize_name(name)
+        if self.instance.pk:
+            # Entries find their customer by this key, so it never changes
+            if key != self.instance.normalized_name:
+                raise forms.ValidationError(
+                    'Only the case and spacing of a customer name can be changed; '
+                    'entries are matched to customers by the normalized name.'
+                )
+        elif Customer.objects.filter(normalized_name=key).exists():
+            raise forms.ValidationError('A customer with this name already exists.')
+        return name
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    form = CustomerAdminForm
+    list_display = ('name', 'normalized_name', 'created_at')
+    search_fields = ('normalized_name',)
+    readonly_fields = ('normalized_name', 'created_at')
+    ordering = ('normalized_name',)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.normalized_name = Customer.normalize_name(obj.name)
+        super().save_model(request, obj, form, change)
+
+@admin.register(ArchivedEntry)
+class ArchivedEntryAdmin(admin.ModelAdmin):
+    list_display = ('serial_number', 'customer_name', 'date', 'amount', 'weight', 'status', 'interest_amount', 'user', 'released_at', 'archived_at')
+    list_filter = ('status', 'date', 'archived_at')
+    search_fields = ('serial_number', 'customer_name', 'user__username')
+    ordering = ('-date',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class AnnualRateFilter(admin.SimpleListFilter):
+    title = 'annual interest rate'
+    parameter_name = 'annual_rate'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('12', '12% or more'),
+            ('13', '13% or more'),
+            ('13.8', '13.8% or more'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            # Uses the expression index on payload -> 'annual_rate'
+            return queryset.alias(annual_rate=PAYLOAD_ANNUAL_RATE).filter(annual_rate__gte=Decimal(self.value()))
+        return queryset
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('timestamp', 'user', 'action', 'details')
-    list_filter = ('action', 'user', 'timestamp')
-    search_fields = ('user__username', 'action', 'details')
-    readonly_fields = ('timestamp', 'user', 'action', 'details')
+    list_filter = ('action', AnnualRateFilter, 'user', 'timestamp')
+    # Exact matches only; details is free text and would need a full LIKE scan
+    search_fields = ('=user__username', '=loan__serial_number')
+    readonly_fields = ('timestamp', 'user', 'action', 'details', 'payload')
     ordering = ('-timestamp',)
+
+
+@admin.register(MaturityAlert)
+class MaturityAlertAdmin(admin.ModelAdmin):
+    list_display = ('entry', 'kind', 'trigger_date', 'updated_at')
+    list_filter = ('kind',)
+    search_fields = ('entry__serial_number', 'entry__customer_name')
+    list_select_related = ('entry',)
+    readonly_fields = ('entry', 'kind', 'trigger_date', 'updated_at')
+    ordering = ('trigger_date',)
+
+@admin.register(MaturityScan)
+class MaturityScanAdmin(admin.ModelAdmin):
+    list_display = ('scanned_through', 'started_at', 'alerts_written')
+    readonly_fields = ('scanned_through', 'started_at', 'alerts_written')
+    ordering = ('-scanned_through',)
+
+@admin.register(PortfolioSnapshot)
+class PortfolioSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('taken_at', 'last_audit_id', 'active_loans', 'active_principal', 'active_weight')
+    exclude = ('entries',)
+    readonly_fields = ('taken_at', 'last_audit_id', 'active_loans', 'active_principal', 'active_weight')
+    ordering = ('-taken_at',)
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'operation', 'user', 'created_at')
+    list_filter = ('operation',)
+    search_fields = ('=key', '=user__username')
+    readonly_fields = ('user', 'key', 'operation', 'result', 'created_at')
+    ordering = ('-created_at',)
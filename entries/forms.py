@@ -44,13 +44,20 @@ class InterestCalculationForm(forms.Form):
         cleaned_data = super().clean()
         rate_type = cleaned_data.get('rate_type')
         daily_rate = cleaned_data.get('daily_rate')
-        
+
+        # A missing or unknown rate type is already a field error
+        if not rate_type:
+            return cleaned_data
+
         if rate_type == 'custom' and not daily_rate:
             raise forms.ValidationError('Please enter a custom daily rate')
             
-        if rate_type != 'custom':
+        if rate_type == 'custom':
+            cleaned_data['annual_rate'] = None
+        else:
             # Convert annual rate to daily rate
             annual_rate = Decimal(rate_type)
+            cleaned_data['annual_rate'] = annual_rate
             cleaned_data['daily_rate'] = round(annual_rate / Decimal('365'), 4)
             
         return cleaned_data
@@ -66,4 +73,22 @@ class EntryFilterForm(forms.Form):
     status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
     date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
     date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
-    customer_name = forms.CharField(required=False) 
\ No newline at end of file
+    ORDER_CHOICES = [
+        ('', 'Default'),
+        ('-total_amount', 'Total amount (high to low)'),
+        ('total_amount', 'Total amount (low to high)'),
+        ('from_date', 'Oldest loans first'),
+        ('-from_date', 'Newest loans first'),
+    ]
+
+    customer_name = forms.CharField(required=False)
+    total_min = forms.DecimalField(label='Total amount from', required=False, decimal_places=2)
+    total_max = forms.DecimalField(label='Total amount to', required=False, decimal_places=2)
+    order_by = forms.ChoiceField(choices=ORDER_CHOICES, required=False)
+
+class PortfolioDateForm(forms.Form):
+    as_of = forms.DateField(label='Active book as of', widget=forms.DateInput(attrs={'type': 'date'}))
+
+class ReportFilterForm(forms.Form):
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
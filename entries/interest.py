@@ -0,0 +1,38 @@
+"""
+Decimal arithmetic behind Entry.calculate_interest.
+
+All of it runs in INTEREST_CONTEXT, which is Python's default context
+(28 digits, round half even) made explicit, so a caller changing the
+thread's context cannot change an amount. The compound factor
+(1 + rate) ** days - 1 is the expensive step. Only a few rates and a
+bounded range of day counts occur in practice, so it is memoized.
+"""
+from decimal import ROUND_HALF_EVEN, Context, Decimal, localcontext
+from functools import lru_cache
+
+INTEREST_CONTEXT = Context(prec=28, rounding=ROUND_HALF_EVEN)
+
+ONE = Decimal('1')
+HUNDRED = Decimal('100')
+
+
+def as_decimal(rate):
+    """rate as a Decimal; other types go through str() so 0.1 stays 0.1"""
+    return rate if isinstance(rate, Decimal) else Decimal(str(rate))
+
+
+@lru_cache(maxsize=4096)
+def compound_factor(daily_rate, days):
+    """(1 + daily_rate%) ** days - 1, for a Decimal daily_rate in percent"""
+    with localcontext(INTEREST_CONTEXT):
+        return (ONE + daily_rate / HUNDRED) ** Decimal(days) - ONE
+
+
+def loan_interest(amount, daily_rate, days, compound):
+    """Interest on amount at daily_rate% for days, rounded to paise"""
+    with localcontext(INTEREST_CONTEXT):
+        if compound:
+            interest = amount * compound_factor(daily_rate, days)
+        else:
+            interest = amount * (daily_rate / HUNDRED) * Decimal(days)
+        return round(interest, 2)
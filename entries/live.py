@@ -0,0 +1,193 @@
+"""
+Live updates for the admin dashboard over Server-Sent Events.
+
+One DashboardFeed per worker process polls the AuditLog id high-water mark
+(plus recent rows that committed late, below it) and fans new events out to
+every connected dashboard, so the database load does not grow with the
+number of open dashboards. Requires the ASGI server.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import AllEntry, AuditLog, Entry
+
+logger = logging.getLogger(__name__)
+
+
+def dashboard_counters():
+    """The admin_dashboard statistics, in one aggregate over the combined view."""
+    totals = AllEntry.objects.aggregate(
+        total_entries=Count('id'),
+        released_entries=Count('id', filter=Q(status='released')),
+        total_principal=Sum('amount'),
+        total_interest=Sum('interest_amount'),
+    )
+    # Active loans are never archived, so the live table answers this on its own
+    totals['active_entries'] = Entry.objects.filter(status='active').count()
+    totals['total_principal'] = totals['total_principal'] or 0
+    totals['total_interest'] = totals['total_interest'] or 0
+    return totals
+
+
+class _Cursor:
+    """Where one dashboard is in the activity stream."""
+    __slots__ = ('last_id', 'known')
+
+    def __init__(self, last_id):
+        # Newest AuditLog id the client has, None until the feed sets it
+        self.last_id = last_id
+        # Ids up to last_id inside the late-commit window that the client has,
+        # so a row committed late below last_id can still be sent once
+        self.known = None
+
+
+class DashboardFeed:
+    poll_interval = 2  # seconds between AuditLog polls while anyone is listening
+    batch_size = 100
+    queue_size = 100
+
+    def __init__(self):
+        self.subscribers = {}  # queue -> _Cursor
+        self.counters = None
+        self.task = None
+        # One thread, and so one database connection, per worker for all polling
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard-feed')
+
+    def subscribe(self, after=None):
+        """
+        Queue of (event, data, id) messages. after is the newest AuditLog id
+        the client already shows; activity starts right after it, or at the
+        next poll's newest id when None.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[queue] = _Cursor(after)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.pop(queue, None)
+
+    def _send(self, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Drop a client this far behind; None ends its stream and the
+            # browser reconnects with a fresh page load
+            self.subscribers.pop(queue, None)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def publish(self, event, data, event_id=None):
+        for queue in list(self.subscribers):
+            self._send(queue, (event, data, event_id))
+
+    def _db(self, func, *args):
+        return sync_to_async(func, thread_sensitive=False, executor=self.executor)(*args)
+
+    def close(self):
+        """Close the polling thread's database connection"""
+        # connection.close must be looked up in that thread, not passed from this one
+        return self._db(lambda: connection.close())
+
+    async def _run(self):
+        try:
+            while self.subscribers:
+                try:
+                    await self.poll()
+                except Exception:
+                    logger.exception('Dashboard feed poll failed')
+                    await self.close()
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            # Counters compared against after an idle gap would be stale
+            self.counters = None
+
+    def _events(self, logs):
+        return [
+            {
+                'id': log.id,
+                'timestamp': log.timestamp,
+                'user': log.user.username,
+                'action': log.action,
+                'details': log.details,
+            }
+            for log in logs
+        ]
+
+    def _fetch(self, since, need_last_id):
+        # Read the high-water mark before the events, so a subscriber starting
+        # from it misses nothing fetched after
+        last_id = None
+        if need_last_id:
+            last_id = AuditLog.objects.aggregate(last=Max('id'))['last'] or 0
+        window_start = timezone.now() - AuditLog.LATE_COMMIT_WINDOW
+        recent = set(AuditLog.objects.filter(timestamp__gte=window_start).values_list('id', flat=True))
+        events = []
+        if since is not None:
+            logs = AuditLog.objects.filter(id__gt=since).select_related('user').order_by('id')
+            events = self._events(logs[:self.batch_size])
+        return events, recent, last_id
+
+    def _fetch_late(self, ids, need_counters):
+        logs = AuditLog.objects.filter(id__in=ids).select_related('user')
+        events = self._events(logs) if ids else []
+        return events, dashboard_counters() if need_counters else None
+
+    async def poll(self):
+        # Clients that subscribe while this poll awaits the database are left
+        # for the next one, which fetches the high-water mark they start from
+        polled = list(self.subscribers.items())
+        cursors = [cursor.last_id for _, cursor in polled if cursor.last_id is not None]
+        events, recent, last_id = await self._db(
+            self._fetch, min(cursors, default=None), len(cursors) < len(polled)
+        )
+
+        late = {}
+        for _, cursor in polled:
+            if cursor.last_id is None:
+                cursor.last_id = last_id
+            if cursor.known is None:
+                cursor.known = {i for i in recent if i <= cursor.last_id}
+            late[cursor] = sorted(i for i in recent if i <= cursor.last_id and i not in cursor.known)
+
+        # Counters only change when something was logged, so recompute them only then
+        late_ids = set().union(*late.values())
+        late_events, counters = await self._db(
+            self._fetch_late, late_ids, bool(events or late_ids) or self.counters is None
+        )
+        late_events = {event['id']: event for event in late_events}
+
+        for queue, cursor in polled:
+            if self.subscribers.get(queue) is not cursor:
+                continue  # Left, or was dropped, while the poll awaited
+            for event_id in late[cursor]:
+                self._send(queue, ('activity', late_events[event_id], event_id))
+                cursor.known.add(event_id)
+            for event in events:
+                if event['id'] > cursor.last_id:
+                    self._send(queue, ('activity', event, event['id']))
+                    cursor.last_id = event['id']
+                    cursor.known.add(event['id'])
+            cursor.known &= recent | {event['id'] for event in events}
+
+        if counters is None:
+            return
+        changed = {
+            key: value for key, value in counters.items()
+            if self.counters is not None and self.counters.get(key) != value
+        }
+        self.counters = counters
+        if changed:
+            self.publish('counters', changed)
+
+
+feed = DashboardFeed()
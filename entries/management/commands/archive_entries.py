@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from entries.models import ArchivedEntry, Entry
+
+ARCHIVED_FIELDS = [
+    field.attname for field in ArchivedEntry._meta.concrete_fields
+    if field.name != 'archived_at' and not field.generated
+]
+
+
+class Command(BaseCommand):
+    help = 'Move released and removed entries from the live Entry table into ArchivedEntry in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Entries moved per transaction')
+        parser.add_argument('--older-than-days', type=int, default=30,
+                            help='Only archive entries closed at least this many days ago')
+        parser.add_argument('--limit', type=int,
+                            help='Stop after moving this many entries')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        closed = Entry.objects.exclude(status='active').filter(updated_at__lt=cutoff)
+
+        moved = 0
+        while options['limit'] is None or moved < options['limit']:
+            size = batch_size
+            if options['limit'] is not None:
+                size = min(size, options['limit'] - moved)
+            count = self._move_batch(closed, size)
+            if not count:
+                break
+            moved += count
+            self.stdout.write(f'Archived {moved} entries so far...')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} entries.'))
+
+    def _move_batch(self, closed, size):
+        """Copy one batch into the archive and delete it from Entry in a single transaction."""
+        with transaction.atomic():
+            # skip_locked keeps the job from waiting on rows a teller is editing
+            rows = list(
+                closed.select_for_update(skip_locked=True)
+                .order_by('pk')
+                .values(*ARCHIVED_FIELDS)[:size]
+            )
+            if not rows:
+                return 0
+            now = timezone.now()
+            ArchivedEntry.objects.bulk_create([ArchivedEntry(archived_at=now, **row) for row in rows])
+            Entry.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        return len(rows)
@@ -0,0 +1,136 @@
+import re
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from entries.forms import InterestCalculationForm
+from entries.models import AuditLog, Entry
+
+INTEREST_DETAILS = re.compile(r'Interest calculated with rate (?P<rate>[\d.]+)% for (?P<days>-?\d+) days')
+
+# Status change implied by each action, for rows that predate structured payloads
+STATUS_CHANGES = {
+    'create': (None, 'active'),
+    'edit': ('active', 'active'),
+    'calculate_interest': (None, None),
+    'release': ('active', 'released'),
+}
+
+
+# Daily rate the interest form produces for each fixed choice -> that annual rate
+FORM_RATES = {
+    Entry.get_daily_rate(rate): Decimal(rate)
+    for rate, _ in InterestCalculationForm.RATE_CHOICES if rate != 'custom'
+}
+
+CENTS = Decimal('0.01')
+
+
+def interest_keys(daily_rate, days):
+    """
+    interest_payload for a row that kept only the daily rate. One the form
+    produces for a fixed choice is taken to be that choice; any other was a
+    custom rate.
+    """
+    daily_rate = Decimal(str(daily_rate))
+    return AuditLog.interest_payload(daily_rate, days, FORM_RATES.get(daily_rate))
+
+
+def string_typed_keys(payload):
+    """payload with typed keys once written as JSON numbers as decimal strings"""
+    payload = dict(payload)
+    for key in ('amount', 'interest_amount'):
+        if isinstance(payload.get(key), (int, float)):
+            payload[key] = str(Decimal(str(payload[key])).quantize(CENTS))
+    if isinstance(payload.get('daily_rate'), (int, float)):
+        # annual_rate was worked back from the daily rate alongside it
+        payload.update(interest_keys(payload['daily_rate'], payload.get('days')))
+    return payload
+
+
+def structured_payload(log):
+    """
+    Typed payload for a row written before the typed keys existed: derived
+    from its before/after states when present, else from the action and the
+    free-text details.
+    """
+    payload = dict(log.payload)
+    if payload.get('after'):
+        payload = AuditLog.build_payload(payload.get('before'), payload['after'])
+    else:
+        old_status, new_status = STATUS_CHANGES.get(log.action, (None, None))
+        if old_status:
+            payload['old_status'] = old_status
+        if new_status:
+            payload['new_status'] = new_status
+    match = INTEREST_DETAILS.search(log.details or '')
+    if match:
+        payload.update(interest_keys(match['rate'], int(match['days'])))
+    # Mark rows with nothing recoverable so they are not read again
+    return payload or {'legacy': True}
+
+
+class Command(BaseCommand):
+    help = 'Add typed payload keys to AuditLog rows written before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Audit rows read and updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        filled = self.fill_payloads(batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Added typed payload keys to {filled} audit rows.'))
+        converted = self.convert_numbers(batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Rewrote numeric typed keys as decimal strings on {converted} audit rows.'))
+
+    def fill_payloads(self, batch_size):
+        last_pk = 0
+        filled = 0
+        while True:
+            logs = list(
+                AuditLog.objects.filter(pk__gt=last_pk)
+                .exclude(payload__has_key='new_status')
+                .exclude(payload__has_key='annual_rate')
+                .exclude(payload__has_key='legacy')
+                .order_by('pk')
+                .only('pk', 'action', 'details', 'payload')[:batch_size]
+            )
+            if not logs:
+                break
+            last_pk = logs[-1].pk
+            for log in logs:
+                log.payload = structured_payload(log)
+            with transaction.atomic():
+                AuditLog.objects.bulk_update(logs, ['payload'], batch_size=batch_size)
+            filled += len(logs)
+        return filled
+
+    def convert_numbers(self, batch_size):
+        """
+        Rewrite typed keys stored as JSON numbers, with annual_rate worked
+        back from the rounded daily rate (12% as 12.01), as decimal strings.
+        """
+        last_pk = 0
+        converted = 0
+        while True:
+            logs = list(
+                AuditLog.objects.filter(pk__gt=last_pk, payload__has_any_keys=['amount', 'daily_rate'])
+                .order_by('pk')
+                .only('pk', 'payload')[:batch_size]
+            )
+            if not logs:
+                break
+            last_pk = logs[-1].pk
+            stale = []
+            for log in logs:
+                payload = string_typed_keys(log.payload)
+                if payload != log.payload:
+                    log.payload = payload
+                    stale.append(log)
+            if stale:
+                with transaction.atomic():
+                    AuditLog.objects.bulk_update(stale, ['payload'], batch_size=batch_size)
+            converted += len(stale)
+        return converted
@@ -0,0 +1,56 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from entries.models import ArchivedEntry, Customer, Entry
+
+
+class Command(BaseCommand):
+    help = 'Create Customer rows from entry customer names and link unlinked entries to them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Entries read and updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        for model in (Entry, ArchivedEntry):
+            linked = self._backfill(model, batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'Linked {linked} {model.__name__} rows to customers.'
+            ))
+
+    def _backfill(self, model, batch_size):
+        linked = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects.filter(customer__isnull=True, pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'customer_name')[:batch_size]
+            )
+            if not rows:
+                return linked
+            last_pk = rows[-1][0]
+
+            pks_by_key = defaultdict(list)
+            names = {}
+            for pk, name in rows:
+                key = Customer.normalize_name(name)
+                pks_by_key[key].append(pk)
+                names.setdefault(key, ' '.join(name.split()))
+
+            with transaction.atomic():
+                Customer.objects.bulk_create(
+                    [Customer(name=names[key], normalized_name=key) for key in pks_by_key],
+                    ignore_conflicts=True,
+                )
+                customer_ids = dict(
+                    Customer.objects.filter(normalized_name__in=list(pks_by_key))
+                    .values_list('normalized_name', 'pk')
+                )
+                # One UPDATE per distinct customer in the batch
+                for key, pks in pks_by_key.items():
+                    model.objects.filter(pk__in=pks).update(customer_id=customer_ids[key])
+            linked += len(rows)
@@ -0,0 +1,55 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from entries.interest import compound_factor
+from entries.models import Entry
+
+
+def previous_interest(entry, daily_rate):
+    """Entry.calculate_interest as it was before the compound factor cache"""
+    days = max((entry.to_date - entry.from_date).days, Entry.MIN_INTEREST_DAYS)
+    daily_rate_decimal = Decimal(str(daily_rate)) / Decimal('100')
+    days_decimal = Decimal(str(days))
+    if days >= Entry.COMPOUND_INTEREST_DAYS:
+        interest = entry.amount * ((Decimal('1') + daily_rate_decimal) ** days_decimal - Decimal('1'))
+    else:
+        interest = entry.amount * daily_rate_decimal * days_decimal
+    return round(interest, 2)
+
+
+class Command(BaseCommand):
+    help = 'Time Entry.calculate_interest on long loans against the implementation before the factor cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=20000,
+                            help='Calls per measurement')
+
+    def handle(self, *args, **options):
+        # The two form choices, as InterestCalculationForm turns them into daily rates
+        rates = [round(Decimal(rate) / Decimal('365'), 4) for rate in ('12', '13.8')]
+        entries = [
+            Entry(amount=Decimal('125000.00'), from_date=date(2020, 1, 1),
+                  to_date=date(2020, 1, 1) + timedelta(days=days))
+            for days in range(365, 1100, 7)
+        ]
+        calls = [(entries[i % len(entries)], rates[i % len(rates)]) for i in range(options['calls'])]
+
+        def previous():
+            for entry, rate in calls:
+                previous_interest(entry, rate)
+
+        def cached():
+            for entry, rate in calls:
+                entry.calculate_interest(rate)
+
+        # Starts cold, so the first call for each (rate, days) pays for its factor
+        compound_factor.cache_clear()
+        for label, run in (('previous', previous), ('cached', cached)):
+            started = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - started
+            self.stdout.write(f'{label:<10} {seconds / len(calls) * 1e6:8.2f} us/call')
+        self.stdout.write(str(compound_factor.cache_info()))
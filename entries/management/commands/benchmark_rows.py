@@ -0,0 +1,56 @@
+import io
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from entries import rows
+from entries.models import AllEntry, Entry
+
+
+class Command(BaseCommand):
+    help = ('Compare time and peak memory of loading list pages as model instances and as row projections, '
+            'and of the whole Excel export')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the best one is reported')
+
+    def handle(self, *args, **options):
+        pages = [
+            ('entry_list', Entry.objects.filter(status='active'), rows.ENTRY_LIST),
+            ('admin_dashboard', AllEntry.objects.all(), rows.DASHBOARD),
+            ('released_entries', AllEntry.objects.filter(status='released'), rows.RELEASED),
+            ('export_to_excel', AllEntry.objects.all(), rows.EXPORT),
+        ]
+        self.stdout.write(f"{'page':<18} {'rows':>8}  {'loader':<10} {'ms':>9} {'peak MB':>9} {'bytes/row':>10}")
+        for page, queryset, columns in pages:
+            loaders = [
+                ('instances', lambda: list(queryset.select_related('user'))),
+                ('projected', lambda: list(rows.project(queryset, columns))),
+                ('streamed', lambda: sum(1 for _ in rows.stream(queryset, columns))),
+            ]
+            if page == 'export_to_excel':
+                # Loading is only part of the export; this is what the view does, workbook included
+                loaders.append(('xlsx', lambda: rows.write_export(queryset, io.BytesIO())))
+            count = queryset.count()
+            for loader, load in loaders:
+                seconds, peak = self._measure(load, options['repeat'])
+                per_row = peak / count if count else 0
+                self.stdout.write(
+                    f'{page:<18} {count:>8}  {loader:<10} {seconds * 1000:>9.1f} '
+                    f'{peak / 2**20:>9.2f} {per_row:>10.0f}'
+                )
+
+    def _measure(self, load, repeat):
+        best_seconds = best_peak = None
+        for _ in range(repeat):
+            tracemalloc.start()
+            started = time.perf_counter()
+            load()
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+            best_peak = peak if best_peak is None else min(best_peak, peak)
+        return best_seconds, best_peak
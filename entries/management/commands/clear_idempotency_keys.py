@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from entries.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored sync_batch outcomes older than IdempotencyKey.RETENTION'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Keys deleted per statement')
+        parser.add_argument('--older-than-days', type=int, default=IdempotencyKey.RETENTION.days,
+                            help='Only delete keys stored at least this many days ago')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+
+        deleted = 0
+        while True:
+            pks = list(expired.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            deleted += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys.'))
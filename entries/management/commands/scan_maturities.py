@@ -0,0 +1,122 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from entries.models import Entry, MaturityAlert, MaturityScan
+
+# Days before the compound switch at which a loan is flagged as approaching it
+APPROACH_DAYS = 30
+
+# (kind, days after from_date) in increasing severity, so later milestones win
+MILESTONES = [
+    ('due', Entry.MIN_INTEREST_DAYS),
+    ('approaching', Entry.COMPOUND_INTEREST_DAYS - APPROACH_DAYS),
+    ('overdue', Entry.COMPOUND_INTEREST_DAYS),
+]
+
+
+def milestone_for(from_date, today):
+    """Return the most severe (kind, trigger_date) reached by ``today``, or None."""
+    reached = None
+    for kind, days in MILESTONES:
+        trigger_date = from_date + timedelta(days=days)
+        if trigger_date <= today:
+            reached = (kind, trigger_date)
+    return reached
+
+
+class Command(BaseCommand):
+    help = 'Update the maturity worklist with active loans that crossed an interest milestone since the last scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-days', type=int, default=31,
+                            help='Width of each from_date range read from the database')
+        parser.add_argument('--through', type=date.fromisoformat,
+                            help='Scan up to this date (YYYY-MM-DD, defaults to today)')
+        parser.add_argument('--full', action='store_true',
+                            help='Ignore previous scans and rebuild the worklist from all active loans')
+
+    def handle(self, *args, **options):
+        started_at = timezone.now()
+        today = options['through'] or timezone.localdate()
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+
+        last = None
+        if not options['full']:
+            last = MaturityScan.objects.order_by('-scanned_through', '-started_at').first()
+        if last and last.scanned_through >= today:
+            self.stdout.write(f'Already scanned through {last.scanned_through}, nothing to do.')
+            return
+
+        if options['full']:
+            purged, _ = MaturityAlert.objects.all().delete()
+        else:
+            # Drop rows for loans that were released or removed since they were flagged
+            purged, _ = MaturityAlert.objects.exclude(entry__status='active').delete()
+
+        written = 0
+        for kind, days in MILESTONES:
+            offset = timedelta(days=days)
+            high = today - offset
+            if last:
+                low = last.scanned_through - offset
+            else:
+                earliest = Entry.objects.filter(status='active').aggregate(Min('from_date'))['from_date__min']
+                if earliest is None:
+                    break
+                low = earliest - timedelta(days=1)
+            written += self._scan_window(kind, offset, low, high, chunk)
+
+        if last:
+            # Loans created or back-dated after the last run fall outside its window
+            written += self._rescan_touched(last.started_at, today)
+
+        MaturityScan.objects.create(scanned_through=today, started_at=started_at, alerts_written=written)
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned through {today}: {written} worklist rows written, {purged} stale rows removed.'
+        ))
+
+    def _scan_window(self, kind, offset, low, high, chunk):
+        """Flag loans with low < from_date <= high, one from_date range per query."""
+        written = 0
+        while low < high:
+            upper = min(low + chunk, high)
+            rows = Entry.objects.filter(
+                status='active', from_date__gt=low, from_date__lte=upper
+            ).values_list('id', 'from_date')
+            written += self._write([
+                MaturityAlert(entry_id=pk, kind=kind, trigger_date=from_date + offset)
+                for pk, from_date in rows
+            ])
+            low = upper
+        return written
+
+    def _rescan_touched(self, since, today):
+        alerts = []
+        cleared = []
+        rows = Entry.objects.filter(status='active', updated_at__gte=since).values_list('id', 'from_date')
+        for pk, from_date in rows.iterator():
+            milestone = milestone_for(from_date, today)
+            if milestone:
+                alerts.append(MaturityAlert(entry_id=pk, kind=milestone[0], trigger_date=milestone[1]))
+            else:
+                cleared.append(pk)
+        if cleared:
+            MaturityAlert.objects.filter(entry_id__in=cleared).delete()
+        return self._write(alerts)
+
+    def _write(self, alerts):
+        if not alerts:
+            return 0
+        with transaction.atomic():
+            MaturityAlert.objects.bulk_create(
+                alerts,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['entry'],
+                update_fields=['kind', 'trigger_date', 'updated_at'],
+            )
+        return len(alerts)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from entries.portfolio import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Store a snapshot of all active entries for point-in-time portfolio queries (run periodically, e.g. nightly)'
+
+    def handle(self, *args, **options):
+        snapshot = take_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot at {snapshot.taken_at}: {snapshot.active_loans} active loans, '
+            f'principal {snapshot.active_principal}, weight {snapshot.active_weight}g.'
+        ))
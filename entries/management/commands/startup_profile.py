@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from entries.startup import heavy_modules_loaded, profile_startup
+
+
+class Command(BaseCommand):
+    help = 'Report import time and memory of a cold web worker for the WSGI and ASGI entry points'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', dest='modules',
+                            help='Entry point module to profile (default: entry_management.wsgi and .asgi)')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Number of slowest top-level packages to list')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if a profile is over settings.STARTUP_BUDGET or loads a heavy module')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or ['entry_management.wsgi', 'entry_management.asgi']
+        budget = settings.STARTUP_BUDGET
+        failures = []
+
+        for module in modules:
+            profile = profile_startup(module)
+            self.stdout.write(self.style.MIGRATE_HEADING(module))
+            for stage in profile['stages']:
+                self.stdout.write(f"  {stage['stage']:<32} {stage['seconds'] * 1000:8.1f} ms  {self._mb(stage['rss_kb'])}")
+            self.stdout.write(f"  {'total':<32} {profile['seconds'] * 1000:8.1f} ms  {self._mb(profile['rss_kb'])}")
+            self.stdout.write('  Slowest packages (cumulative import time):')
+            for package, seconds in profile['imports'][:options['top']]:
+                self.stdout.write(f'    {package:<30} {seconds * 1000:8.1f} ms')
+
+            heavy = heavy_modules_loaded(profile['modules'])
+            if heavy:
+                failures.append(f"{module} imports {', '.join(heavy)} at startup")
+            if profile['seconds'] > budget['seconds']:
+                failures.append(f"{module} took {profile['seconds']:.2f}s, budget is {budget['seconds']}s")
+            if profile['rss_kb'] is not None and profile['rss_kb'] / 1024 > budget['rss_mb']:
+                failures.append(f"{module} uses {profile['rss_kb'] / 1024:.1f} MB, budget is {budget['rss_mb']} MB")
+
+        for failure in failures:
+            self.stdout.write(self.style.WARNING(failure))
+        if options['check'] and failures:
+            raise CommandError('Startup budget exceeded.')
+
+    def _mb(self, rss_kb):
+        return 'n/a' if rss_kb is None else f'{rss_kb / 1024:6.1f} MB'
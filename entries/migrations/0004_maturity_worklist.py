@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0003_entry_from_date_entry_to_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaturityAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('due', 'Minimum period reached'), ('approaching', 'Approaching compound interest'), ('overdue', 'Compound interest applies')], max_length=20)),
+                ('trigger_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MaturityScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scanned_through', models.DateField()),
+                ('started_at', models.DateTimeField()),
+                ('alerts_written', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'get_latest_by': 'scanned_through',
+            },
+        ),
+        migrations.AlterField(
+            model_name='entry',
+            name='from_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['status', 'from_date'], name='entry_status_from_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['updated_at'], name='entry_updated_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='maturityalert',
+            name='entry',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='maturity_alert', to='entries.entry'),
+        ),
+        migrations.AddIndex(
+            model_name='maturityalert',
+            index=models.Index(fields=['kind', 'trigger_date'], name='maturityalert_kind_date_idx'),
+        ),
+    ]
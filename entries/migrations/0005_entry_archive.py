@@ -0,0 +1,87 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+ENTRY_COLUMNS = (
+    'id, user_id, date, from_date, to_date, serial_number, customer_name, amount, weight, '
+    'given_by, status, interest_rate, interest_amount, created_at, updated_at, released_at'
+)
+
+CREATE_ALLENTRY_VIEW = f'''
+CREATE VIEW entries_allentry AS
+SELECT {ENTRY_COLUMNS}, NULL AS archived_at FROM entries_entry
+UNION ALL
+SELECT {ENTRY_COLUMNS}, archived_at FROM entries_archivedentry
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0004_maturity_worklist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllEntry',
+            fields=[
+                ('date', models.DateField()),
+                ('from_date', models.DateField(editable=False)),
+                ('to_date', models.DateField(blank=True, null=True)),
+                ('serial_number', models.CharField(max_length=50)),
+                ('customer_name', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('weight', models.DecimalField(decimal_places=2, help_text='Weight in grams', max_digits=10)),
+                ('given_by', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('released', 'Released'), ('removed', 'Removed')], default='active', max_length=10)),
+                ('interest_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('interest_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'all entries',
+                'db_table': 'entries_allentry',
+                'managed': False,
+            },
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='entry',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='entries.entry'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedEntry',
+            fields=[
+                ('date', models.DateField()),
+                ('from_date', models.DateField(editable=False)),
+                ('to_date', models.DateField(blank=True, null=True)),
+                ('serial_number', models.CharField(max_length=50)),
+                ('customer_name', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('weight', models.DecimalField(decimal_places=2, help_text='Weight in grams', max_digits=10)),
+                ('given_by', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('released', 'Released'), ('removed', 'Removed')], default='active', max_length=10)),
+                ('interest_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('interest_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'archived entries',
+                'indexes': [models.Index(fields=['status', 'date'], name='archivedentry_status_date_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_ALLENTRY_VIEW, 'DROP VIEW IF EXISTS entries_allentry'),
+    ]
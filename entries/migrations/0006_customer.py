@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+ENTRY_COLUMNS = (
+    'id, user_id, customer_id, date, from_date, to_date, serial_number, customer_name, amount, weight, '
+    'given_by, status, interest_rate, interest_amount, created_at, updated_at, released_at'
+)
+
+OLD_ENTRY_COLUMNS = ENTRY_COLUMNS.replace('customer_id, ', '')
+
+VIEW_SQL = '''
+CREATE VIEW entries_allentry AS
+SELECT {columns}, NULL AS archived_at FROM entries_entry
+UNION ALL
+SELECT {columns}, archived_at FROM entries_archivedentry
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0005_entry_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The combined view is rebuilt around the column changes below
+        migrations.RunSQL('DROP VIEW IF EXISTS entries_allentry', VIEW_SQL.format(columns=OLD_ENTRY_COLUMNS)),
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('normalized_name', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedentry',
+            name='customer',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='entries.customer'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='customer',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='entries.customer'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['customer', 'status'], name='entry_customer_status_idx'),
+        ),
+        migrations.RunSQL(VIEW_SQL.format(columns=ENTRY_COLUMNS), 'DROP VIEW IF EXISTS entries_allentry'),
+    ]
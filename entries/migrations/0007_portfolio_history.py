@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0006_customer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(db_index=True)),
+                ('last_audit_id', models.BigIntegerField()),
+                ('entries', models.JSONField(default=dict)),
+                ('active_loans', models.PositiveIntegerField(default=0)),
+                ('active_principal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_weight', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'get_latest_by': 'taken_at',
+            },
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:22
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+OLD_ENTRY_COLUMNS = (
+    'id, user_id, customer_id, date, from_date, to_date, serial_number, customer_name, amount, weight, '
+    'given_by, status, interest_rate, interest_amount, created_at, updated_at, released_at'
+)
+
+ENTRY_COLUMNS = OLD_ENTRY_COLUMNS + ', total_amount'
+
+VIEW_SQL = '''
+CREATE VIEW entries_allentry AS
+SELECT {columns}, NULL AS archived_at FROM entries_entry
+UNION ALL
+SELECT {columns}, archived_at FROM entries_archivedentry
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0007_portfolio_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The combined view is rebuilt around the column changes below
+        migrations.RunSQL('DROP VIEW IF EXISTS entries_allentry', VIEW_SQL.format(columns=OLD_ENTRY_COLUMNS)),
+        migrations.AddField(
+            model_name='archivedentry',
+            name='total_amount',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('amount'), '+', django.db.models.functions.comparison.Coalesce('interest_amount', models.Value(Decimal('0')))), output_field=models.DecimalField(decimal_places=2, max_digits=11)),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='total_amount',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('amount'), '+', django.db.models.functions.comparison.Coalesce('interest_amount', models.Value(Decimal('0')))), output_field=models.DecimalField(decimal_places=2, max_digits=11)),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['total_amount'], name='entry_total_amount_idx'),
+        ),
+        migrations.RunSQL(VIEW_SQL.format(columns=ENTRY_COLUMNS), 'DROP VIEW IF EXISTS entries_allentry'),
+    ]
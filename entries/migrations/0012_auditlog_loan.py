@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_loan(apps, schema_editor):
+    AuditLog = apps.get_model('entries', 'AuditLog')
+    Entry = apps.get_model('entries', 'Entry')
+    AuditLog.objects.update(loan_id=F('entry_id'))
+    # Logs of archived loans point at rows no longer in Entry
+    AuditLog.objects.exclude(entry_id__in=Entry.objects.values('id')).update(entry=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0011_auditlog_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='loan',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='entries.allentry'),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='entry',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='entries.entry'),
+        ),
+        migrations.RunPython(fill_loan, migrations.RunPython.noop),
+    ]
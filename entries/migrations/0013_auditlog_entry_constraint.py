@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0012 so the constraint is added outside the transaction
+    # that rewrote the rows (PostgreSQL refuses with pending trigger events)
+
+    dependencies = [
+        ('entries', '0012_auditlog_loan'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='entry',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='entries.entry'),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='loan',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='entries.allentry'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0013_auditlog_entry_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Create'), ('edit', 'Edit'), ('calculate_interest', 'Calculate Interest'), ('release', 'Release'), ('delete', 'Delete')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:04
+
+import django.db.models.fields.json
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0014_auditlog_delete_action'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='auditlog_annual_rate_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(django.db.models.functions.comparison.Cast(django.db.models.fields.json.KeyTextTransform('annual_rate', 'payload'), models.DecimalField(decimal_places=4, max_digits=10)), name='auditlog_annual_rate_idx'),
+        ),
+    ]
@@ -1,10 +1,87 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce, TruncDate
 from django.conf import settings
 from django.utils import timezone
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
+from datetime import date, timedelta
 from django.contrib.auth.models import User
+from .interest import as_decimal, loan_interest
 
-class Entry(models.Model):
+# Entry fields copied into AuditLog.payload before and after each change,
+# enough to rebuild the loan book as it was at any past moment
+AUDIT_FIELDS = (
+    'user_id', 'date', 'serial_number', 'customer_name', 'amount', 'weight',
+    'status', 'interest_rate', 'interest_amount',
+)
+
+def audit_state_from_values(values):
+    """JSON-safe copy of the AUDIT_FIELDS in a dict of entry values"""
+    state = {}
+    for field in AUDIT_FIELDS:
+        value = values[field]
+        if isinstance(value, Decimal):
+            # As the column holds it; unsaved values may carry more places
+            # (PostgreSQL rounds numeric half away from zero)
+            places = Entry._meta.get_field(field).decimal_places
+            value = value.quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+        if isinstance(value, (Decimal, date)):
+            value = str(value)
+        state[field] = value
+    return state
+
+class Customer(models.Model):
+    """A borrower; entries with the same normalized name belong to the same customer."""
+    name = models.CharField(max_length=100)
+    normalized_name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def normalize_name(name):
+        """Collapse whitespace and case so 'Ravi  Kumar' and 'ravi kumar' match"""
+        return ' '.join(name.split()).casefold()
+
+    @classmethod
+    def for_name(cls, name):
+        customer, _ = cls.objects.get_or_create(
+            normalized_name=cls.normalize_name(name),
+            defaults={'name': ' '.join(name.split())},
+        )
+        return customer
+
+    @classmethod
+    def for_names(cls, names):
+        """{normalized name: Customer} for names, creating the missing ones in one insert"""
+        wanted = {cls.normalize_name(name): ' '.join(name.split()) for name in names}
+        customers = {c.normalized_name: c for c in cls.objects.filter(normalized_name__in=wanted)}
+        missing = [cls(normalized_name=key, name=name) for key, name in wanted.items() if key not in customers]
+        if missing:
+            # Another request may add the same customer meanwhile; read back rather than trust the insert
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            customers.update(
+                (c.normalized_name, c)
+                for c in cls.objects.filter(normalized_name__in=[c.normalized_name for c in missing])
+            )
+        return customers
+
+    def __str__(self):
+        return self.name
+
+class EntryQuerySet(models.QuerySet):
+    def with_days_outstanding(self):
+        """
+        Annotate days_outstanding (a timedelta): from_date until release, or
+        until today for open loans. It depends on today's date, so unlike
+        total_amount it cannot be a stored column.
+        """
+        end = Coalesce(TruncDate('released_at'), Value(timezone.localdate(), output_field=models.DateField()))
+        return self.annotate(
+            days_outstanding=ExpressionWrapper(end - F('from_date'), output_field=models.DurationField())
+        )
+
+class EntryBase(models.Model):
+    """Columns shared by live entries, archived entries and the combined view."""
     STATUS_CHOICES = [
         ('active', 'Active'),
         ('released', 'Released'),
@@ -17,20 +94,63 @@ class Entry(models.Model):
     to_date = models.DateField(null=True, blank=True)
     serial_number = models.CharField(max_length=50)
     customer_name = models.CharField(max_length=100)
+    customer = models.ForeignKey(Customer, on_delete=models.PROTECT, null=True, blank=True, editable=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     weight = models.DecimalField(max_digits=10, decimal_places=2, help_text="Weight in grams")
     given_by = models.CharField(max_length=100)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     interest_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    released_at = models.DateTimeField(null=True, blank=True)
+    # Principal plus interest, computed and stored by the database
+    total_amount = models.GeneratedField(
+        expression=F('amount') + Coalesce('interest_amount', Value(Decimal('0'))),
+        output_field=models.DecimalField(max_digits=11, decimal_places=2),
+        db_persist=True,
+    )
+
+    objects = EntryQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.serial_number} - {self.customer_name}"
+
+class Entry(EntryBase):
+    """Live loans: every active entry plus recently closed ones not yet archived."""
+    # Interest is charged for at least this many days
+    MIN_INTEREST_DAYS = 15
+    # Loans held this long switch from simple to compound interest
+    COMPOUND_INTEREST_DAYS = 365
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'from_date'], name='entry_status_from_date_idx'),
+            models.Index(fields=['updated_at'], name='entry_updated_at_idx'),
+            models.Index(fields=['customer', 'status'], name='entry_customer_status_idx'),
+            models.Index(fields=['total_amount'], name='entry_total_amount_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        entry = super().from_db(db, field_names, values)
+        # Name the customer was resolved from; save() only looks it up again when this changes
+        entry._saved_customer_name = entry.__dict__.get('customer_name')
+        return entry
 
     def save(self, *args, **kwargs):
         # Always set from_date to the entry's date
         self.from_date = self.date
+        if self.customer_id is None or self.customer_name != getattr(self, '_saved_customer_name', None):
+            self.customer = Customer.for_name(self.customer_name)
         super().save(*args, **kwargs)
+        self._saved_customer_name = self.customer_name
 
     def calculate_interest(self, daily_rate):
         if not self.to_date:
@@ -39,26 +159,13 @@ class Entry(models.Model):
         days = (self.to_date - self.from_date).days
         
         # Minimum 15 days interest
-        if days < 15:
-            days = 15
+        if days < self.MIN_INTEREST_DAYS:
+            days = self.MIN_INTEREST_DAYS
             
-        # Convert daily rate to decimal
-        daily_rate_decimal = Decimal(str(daily_rate)) / Decimal('100')
-        days_decimal = Decimal(str(days))
-        
-        if days >= 365:
-            # Compound interest for periods >= 365 days
-            # For 12% annual rate: daily rate = 12/365 = 0.03288%
-            # For 13.8% annual rate: daily rate = 13.8/365 = 0.03781%
-            interest = self.amount * ((Decimal('1') + daily_rate_decimal) ** days_decimal - Decimal('1'))
-        else:
-            # Simple interest for periods < 365 days
-            # For 12% annual rate: daily rate = 12/365 = 0.03288%
-            # For 13.8% annual rate: daily rate = 13.8/365 = 0.03781%
-            interest = self.amount * daily_rate_decimal * days_decimal
-            
-        # Round to 2 decimal places
-        return round(interest, 2)
+        # Compound interest for periods >= 365 days, simple interest below.
+        # For 12% annual rate: daily rate = 12/365 = 0.03288%
+        # For 13.8% annual rate: daily rate = 13.8/365 = 0.03781%
+        return loan_interest(self.amount, as_decimal(daily_rate), days, days >= self.COMPOUND_INTEREST_DAYS)
 
     @classmethod
     def get_daily_rate(cls, annual_rate):
@@ -67,14 +174,147 @@ class Entry(models.Model):
         """
         return round(Decimal(str(annual_rate)) / Decimal('365'), 4)  # Round to 4 decimal places
 
+    def audit_state(self):
+        return audit_state_from_values({field: getattr(self, field) for field in AUDIT_FIELDS})
+
     def release(self):
         """Mark the entry as released"""
         self.status = 'released'
         self.released_at = timezone.now()
         self.save()
 
-    def __str__(self):
-        return f"{self.serial_number} - {self.customer_name}"
+    @classmethod
+    def create_many(cls, entries, user):
+        """
+        Insert unsaved entries for user with one bulk insert and one AuditLog
+        insert, doing what save() does for each. Returns the saved entries.
+        """
+        customers = Customer.for_names(entry.customer_name for entry in entries)
+        for entry in entries:
+            entry.user = user
+            entry.from_date = entry.date
+            entry.customer = customers[Customer.normalize_name(entry.customer_name)]
+        with transaction.atomic():
+            cls.objects.bulk_create(entries, batch_size=500)
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    entry=entry,
+                    loan_id=entry.pk,
+                    user=user,
+                    action='create',
+                    details='Entry created',
+                    payload=AuditLog.build_payload(None, entry.audit_state()),
+                )
+                for entry in entries
+            ])
+        return entries
+
+    @classmethod
+    def release_many(cls, pks, user, queryset=None):
+        """
+        Release the active entries among pks with one UPDATE and one AuditLog insert.
+        Returns (released_ids, skipped_ids).
+        """
+        pks = sorted({int(pk) for pk in pks})
+        queryset = cls.objects.all() if queryset is None else queryset
+        with transaction.atomic():
+            rows = list(
+                queryset.select_for_update()
+                .filter(pk__in=pks, status='active')
+                .values('pk', *AUDIT_FIELDS)
+            )
+            released = [row['pk'] for row in rows]
+            now = timezone.now()
+            cls.objects.filter(pk__in=released, status='active').update(
+                status='released', released_at=now, updated_at=now
+            )
+            logs = []
+            for row in rows:
+                before = audit_state_from_values(row)
+                logs.append(AuditLog(
+                    entry_id=row['pk'],
+                    loan_id=row['pk'],
+                    user=user,
+                    action='release',
+                    details='Entry released',
+                    payload=AuditLog.build_payload(before, dict(before, status='released')),
+                ))
+            AuditLog.objects.bulk_create(logs)
+        released_set = set(released)
+        return released, [pk for pk in pks if pk not in released_set]
+
+    @classmethod
+    def record_interest_many(cls, pks, daily_rate, to_date, user, queryset=None, annual_rate=None):
+        """
+        Calculate and store interest on the active entries among pks with one
+        bulk UPDATE and one AuditLog insert. annual_rate is the rate the user
+        chose, if any (see AuditLog.interest_payload). Returns (updated_ids,
+        skipped_ids).
+        """
+        pks = sorted({int(pk) for pk in pks})
+        queryset = cls.objects.all() if queryset is None else queryset
+        to_date = to_date or timezone.now().date()
+        with transaction.atomic():
+            entries = list(queryset.select_for_update().filter(pk__in=pks, status='active'))
+            now = timezone.now()
+            logs = []
+            for entry in entries:
+                before = entry.audit_state()
+                entry.to_date = to_date
+                entry.interest_amount = entry.calculate_interest(daily_rate)
+                entry.interest_rate = daily_rate
+                entry.updated_at = now
+                days = (entry.to_date - entry.from_date).days
+                logs.append(AuditLog(
+                    entry=entry,
+                    loan_id=entry.pk,
+                    user=user,
+                    action='calculate_interest',
+                    details=f'Interest calculated with rate {daily_rate}% for {days} days',
+                    payload=AuditLog.build_payload(
+                        before, entry.audit_state(), **AuditLog.interest_payload(daily_rate, days, annual_rate)
+                    ),
+                ))
+            cls.objects.bulk_update(
+                entries, ['to_date', 'interest_rate', 'interest_amount', 'updated_at'], batch_size=500
+            )
+            AuditLog.objects.bulk_create(logs)
+        updated = [entry.pk for entry in entries]
+        updated_set = set(updated)
+        return updated, [pk for pk in pks if pk not in updated_set]
+
+class ArchivedEntry(EntryBase):
+    """
+    Released and removed loans moved out of Entry by the archive_entries
+    command, so active-loan queries and indexes stay small.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'archived entries'
+        indexes = [
+            models.Index(fields=['status', 'date'], name='archivedentry_status_date_idx'),
+        ]
+
+class AllEntry(EntryBase):
+    """
+    Read-only view over Entry and ArchivedEntry (UNION ALL), for reports and
+    history pages that need closed loans regardless of where they are stored.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+')
+    customer = models.ForeignKey(Customer, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    total_amount = models.DecimalField(max_digits=11, decimal_places=2)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = 'entries_allentry'
+        verbose_name_plural = 'all entries'
+
+# payload -> 'annual_rate' as a number, for filters served by auditlog_annual_rate_idx
+PAYLOAD_ANNUAL_RATE = Cast(KT('payload__annual_rate'), models.DecimalField(max_digits=10, decimal_places=4))
 
 class AuditLog(models.Model):
     ACTION_CHOICES = [
@@ -82,13 +322,168 @@ class AuditLog(models.Model):
         ('edit', 'Edit'),
         ('calculate_interest', 'Calculate Interest'),
         ('release', 'Release'),
+        ('delete', 'Delete'),
     ]
 
-    entry = models.ForeignKey(Entry, on_delete=models.CASCADE)
+    # Rows are numbered when inserted but become visible when their
+    # transaction commits, so a bulk write can commit ids below ones already
+    # read. Readers that track an id high-water mark (the portfolio replay
+    # and the dashboard feed) also look back this far by timestamp.
+    LATE_COMMIT_WINDOW = timedelta(minutes=10)
+
+    # The live row, cleared when the loan is archived or deleted. loan keeps
+    # the id for good and resolves through AllEntry, archived loans included.
+    entry = models.ForeignKey(Entry, on_delete=models.SET_NULL, null=True, blank=True)
+    loan = models.ForeignKey(AllEntry, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     details = models.TextField(blank=True)
+    # Entry states under 'before'/'after' (see AUDIT_FIELDS) plus the typed
+    # keys added by build_payload, which the indexes below cover
+    payload = models.JSONField(default=dict, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['action', 'timestamp'], name='auditlog_action_time_idx'),
+            models.Index(fields=['timestamp'], name='auditlog_timestamp_idx'),
+            models.Index(PAYLOAD_ANNUAL_RATE, name='auditlog_annual_rate_idx'),
+            models.Index(F('payload__new_status'), name='auditlog_new_status_idx'),
+        ]
+
+    @staticmethod
+    def build_payload(before, after, **extra):
+        """
+        before/after entry states plus typed top-level keys: old_status,
+        new_status, amount and interest_amount as JSON numbers, and any extra
+        keys such as those from interest_payload. Amounts are decimal strings,
+        as in the states.
+        """
+        payload = {'before': before, 'after': after}
+        if before:
+            payload['old_status'] = before['status']
+        if after:
+            payload['new_status'] = after['status']
+            payload['amount'] = after['amount']
+            if after['interest_amount'] is not None:
+                payload['interest_amount'] = after['interest_amount']
+        payload.update(extra)
+        return payload
+
+    @staticmethod
+    def interest_payload(daily_rate, days, annual_rate=None):
+        """
+        Typed keys for an interest calculation, rates as decimal strings.
+        annual_rate is the rate the user chose; a custom daily rate has none
+        and is stored as daily_rate * 365 unrounded, so it never lands in a
+        bucket the user did not pick.
+        """
+        daily_rate = as_decimal(daily_rate)
+        if annual_rate is None:
+            annual_rate = daily_rate * 365
+        return {
+            'daily_rate': str(daily_rate),
+            'annual_rate': str(as_decimal(annual_rate)),
+            'days': days,
+        }
+
+    @classmethod
+    def record(cls, entry, user, action, details='', before=None, **extra):
+        """Log an action on entry with its state before the change and as saved now"""
+        return cls.objects.create(
+            entry=entry,
+            user=user,
+            action=action,
+            details=details,
+            payload=cls.build_payload(before, entry.audit_state(), **extra),
+        )
+
+    def save(self, *args, **kwargs):
+        # bulk_create skips this; callers set loan_id themselves there
+        if self.loan_id is None:
+            self.loan_id = self.entry_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.action} by {self.user} on entry {self.loan_id}"
+
+
+class MaturityAlert(models.Model):
+    """Worklist row for an active loan that has reached an interest milestone."""
+    KIND_CHOICES = [
+        ('due', 'Minimum period reached'),
+        ('approaching', 'Approaching compound interest'),
+        ('overdue', 'Compound interest applies'),
+    ]
+
+    entry = models.OneToOneField(Entry, on_delete=models.CASCADE, related_name='maturity_alert')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    trigger_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'trigger_date'], name='maturityalert_kind_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.entry}"
+
+class MaturityScan(models.Model):
+    """One run of the scan_maturities command; the latest row marks the scanned window."""
+    scanned_through = models.DateField()
+    started_at = models.DateTimeField()
+    alerts_written = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        get_latest_by = 'scanned_through'
+
+    def __str__(self):
+        return f"Scan through {self.scanned_through}"
+
+class PortfolioSnapshot(models.Model):
+    """
+    Periodic copy of every active loan's audited state. Together with the
+    AuditLog rows after last_audit_id it answers "what did the book look
+    like on DATE" without replaying the whole history.
+    """
+    taken_at = models.DateTimeField(db_index=True)
+    last_audit_id = models.BigIntegerField()
+    # {entry id: audit state} for active entries
+    entries = models.JSONField(default=dict)
+    active_loans = models.PositiveIntegerField(default=0)
+    active_principal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_weight = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        get_latest_by = 'taken_at'
+
+    def __str__(self):
+        return f"Portfolio snapshot at {self.taken_at}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of one operation sent to the sync_batch endpoint, so a
+    device retrying a batch gets the first answer back instead of a duplicate.
+    The clear_idempotency_keys command deletes them after RETENTION.
+    """
+    # How long a device may take to resend a batch and still get it deduplicated
+    RETENTION = timedelta(days=30)
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    operation = models.CharField(max_length=20)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotencykey_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotencykey_created_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.action} by {self.user} on {self.entry}"
+        return f"{self.operation} {self.key} by {self.user}"
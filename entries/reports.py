@@ -0,0 +1,85 @@
+"""
+Grouped rollups of the loan book, computed in the database.
+
+Each report is a single GROUP BY query over AllEntry with conditional
+aggregates, so its cost grows with the number of groups, not entries.
+"""
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import AllEntry
+
+# name -> (sheet title, group heading, group expression)
+REPORTS = {
+    'user': ('By User', 'User', F('user__username')),
+    'given_by': ('By Given By', 'Given By', F('given_by')),
+    'month': ('By Month', 'Month', TruncMonth('date')),
+    'status': ('By Status', 'Status', F('status')),
+}
+
+ACTIVE = Q(status='active')
+RELEASED = Q(status='released')
+
+# key -> (column heading, aggregate)
+METRICS = {
+    'loans': ('Loans', Count('id')),
+    'active_loans': ('Active Loans', Count('id', filter=ACTIVE)),
+    'released_loans': ('Released Loans', Count('id', filter=RELEASED)),
+    'principal': ('Principal', Sum('amount')),
+    'outstanding_principal': ('Outstanding Principal', Sum('amount', filter=ACTIVE)),
+    'interest': ('Interest', Sum('interest_amount')),
+    'released_interest': ('Interest On Released', Sum('interest_amount', filter=RELEASED)),
+    'total_weight': ('Weight (g)', Sum('weight')),
+    'active_weight': ('Weight Held (g)', Sum('weight', filter=ACTIVE)),
+}
+
+
+def run_report(name, queryset=None):
+    """Return one dict per group: a 'group' key plus every METRICS key."""
+    group = REPORTS[name][2]
+    queryset = AllEntry.objects.all() if queryset is None else queryset
+    return list(
+        queryset.order_by()
+        .values(group=group)
+        .annotate(**{key: aggregate for key, (_heading, aggregate) in METRICS.items()})
+        .order_by('group')
+    )
+
+
+def run_reports(queryset=None, names=None):
+    return {name: run_report(name, queryset) for name in (names or REPORTS)}
+
+
+def write_workbook(reports, stream):
+    """Write one sheet per report to stream (a file or HttpResponse)."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment
+
+    wb = Workbook()
+    wb.remove(wb.active)
+
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+
+    for name, rows in reports.items():
+        title, group_heading, _group = REPORTS[name]
+        ws = wb.create_sheet(title)
+        headers = [group_heading] + [heading for heading, _aggregate in METRICS.values()]
+        for col, header in enumerate(headers, 1):
+            cell = ws.cell(row=1, column=col)
+            cell.value = header
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = Alignment(horizontal='center')
+            ws.column_dimensions[cell.column_letter].width = max(len(header) + 2, 14)
+
+        for row, values in enumerate(rows, 2):
+            group = values['group']
+            if name == 'month' and group:
+                group = group.strftime('%Y-%m')
+            ws.cell(row=row, column=1, value=group)
+            for col, key in enumerate(METRICS, 2):
+                value = values[key]
+                ws.cell(row=row, column=col, value=float(value) if value is not None else 0)
+
+    wb.save(stream)
@@ -0,0 +1,102 @@
+"""
+Column projections for the pages that list many entries.
+
+Each page names the columns it renders; rows come back as named tuples
+instead of model instances, so unused columns never leave the database and
+Django skips building a model object (and its state) for every row.
+"""
+from django.db.models import F
+
+# Rows fetched per round trip when streaming; on PostgreSQL this is the
+# server-side cursor's fetch size
+CHUNK_SIZE = 2000
+
+ENTRY_LIST = ('pk', 'date', 'serial_number', 'customer_name', 'amount', 'weight', 'given_by', 'updated_at')
+
+DASHBOARD = (
+    'pk', 'date', 'username', 'serial_number', 'customer_id', 'customer_name', 'amount', 'weight',
+    'status', 'interest_rate', 'interest_amount', 'total_amount', 'created_at', 'updated_at',
+)
+
+RELEASED = (
+    'pk', 'date', 'username', 'serial_number', 'customer_id', 'customer_name', 'amount', 'weight',
+    'interest_rate', 'interest_amount', 'total_amount', 'updated_at',
+)
+
+EXPORT = (
+    'date', 'username', 'serial_number', 'customer_name', 'amount', 'weight', 'status',
+    'interest_rate', 'interest_amount', 'total_amount', 'created_at', 'updated_at',
+)
+
+# Row attributes that come from a related table
+RELATED = {
+    'username': F('user__username'),
+}
+
+
+def project(queryset, columns):
+    """queryset as named tuples holding just columns"""
+    related = {name: RELATED[name] for name in columns if name in RELATED}
+    return queryset.annotate(**related).values_list(*columns, named=True)
+
+
+def stream(queryset, columns, chunk_size=CHUNK_SIZE):
+    """Like project(), but read chunk by chunk and never cached on the queryset"""
+    return project(queryset, columns).iterator(chunk_size=chunk_size)
+
+
+# (heading, column width) for each EXPORT column; widths are fixed because a
+# write-only sheet cannot be measured after its rows are written
+EXPORT_HEADINGS = (
+    ('Date', 12), ('User', 16), ('Serial Number', 16), ('Customer Name', 28), ('Amount', 14),
+    ('Weight', 12), ('Status', 10), ('Interest Rate', 14), ('Interest Amount', 16),
+    ('Total Amount', 14), ('Created At', 20), ('Updated At', 20),
+)
+
+
+def write_export(queryset, out):
+    """
+    Write the EXPORT columns of queryset as an xlsx sheet to out (a file or
+    HttpResponse). Rows are streamed into a write-only workbook, so neither
+    the entries nor the cells are held in memory.
+    """
+    # openpyxl is only needed here; importing it lazily keeps it out of worker startup
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Entries Report")
+    for col, (_heading, width) in enumerate(EXPORT_HEADINGS, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    headers = []
+    for heading, _width in EXPORT_HEADINGS:
+        cell = WriteOnlyCell(ws, value=heading)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center')
+        headers.append(cell)
+    ws.append(headers)
+
+    for entry in stream(queryset, EXPORT):
+        ws.append([
+            entry.date,
+            entry.username,
+            entry.serial_number,
+            entry.customer_name,
+            float(entry.amount),
+            float(entry.weight),
+            entry.status,
+            float(entry.interest_rate) if entry.interest_rate else None,
+            float(entry.interest_amount) if entry.interest_amount else None,
+            float(entry.total_amount),
+            # Excel has no time zones
+            entry.created_at.replace(tzinfo=None) if entry.created_at else None,
+            entry.updated_at.replace(tzinfo=None) if entry.updated_at else None,
+        ])
+
+    wb.save(out)
@@ -0,0 +1,96 @@
+"""
+Cold-start profiling for the web worker entry points.
+
+Each profile runs in a fresh interpreter with ``-X importtime`` so that
+modules already imported by the caller (a test runner, manage.py) do not
+hide their cost.
+"""
+import json
+import os
+import subprocess
+import sys
+
+# Libraries that must only be imported by the views that use them
+HEAVY_MODULES = [
+    'openpyxl', 'pandas', 'numpy', 'scipy', 'sklearn', 'grpc',
+    'googleapiclient', 'google.generativeai', 'flask',
+]
+
+CHILD_SCRIPT = '''
+import importlib, json, sys, time
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def rss_kb():
+    # Current RSS on Linux; ru_maxrss elsewhere (on Linux it carries over from the parent)
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def load_urlconf():
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+stages = []
+def stage(name, func):
+    start = time.perf_counter()
+    func()
+    stages.append({'stage': name, 'seconds': time.perf_counter() - start, 'rss_kb': rss_kb()})
+
+stage('interpreter', lambda: None)
+stage(sys.argv[1], lambda: importlib.import_module(sys.argv[1]))
+stage('urlconf', load_urlconf)
+print(json.dumps({'stages': stages, 'modules': sorted(sys.modules)}))
+'''
+
+
+def profile_startup(module):
+    """
+    Import ``module`` (e.g. 'entry_management.wsgi') and the URLconf in a
+    child interpreter. Returns a dict with per-stage 'stages' (seconds and
+    RSS in KB), total 'seconds', final 'rss_kb', the loaded 'modules'
+    and per-package 'imports' as (package, cumulative seconds), slowest first.
+    """
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'entry_management.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, module],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    profile['seconds'] = sum(stage['seconds'] for stage in profile['stages'])
+    profile['rss_kb'] = profile['stages'][-1]['rss_kb']
+    profile['imports'] = _top_level_imports(result.stderr)
+    return profile
+
+
+def _top_level_imports(importtime_output):
+    """Sum -X importtime cumulative times per top-level package."""
+    totals = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented; only count the outermost one
+        if name.startswith('  '):
+            continue
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(cumulative_us) / 1_000_000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def heavy_modules_loaded(modules):
+    return [
+        name for name in HEAVY_MODULES
+        if any(loaded == name or loaded.startswith(name + '.') for loaded in modules)
+    ]
@@ -0,0 +1,202 @@
+"""
+Batch writes for branch devices that queue work while offline.
+
+A batch is a list of operations, each with a key the device chose for it:
+
+    {"key": "k1", "op": "create", "data": {"date": ..., "amount": ..., ...}}
+    {"key": "k2", "op": "interest", "entry": 42, "rate_type": "12", "to_date": "2025-06-01"}
+    {"key": "k3", "op": "release", "entry_key": "k1"}
+
+"data" takes EntryForm fields and interest takes InterestCalculationForm
+fields. "entry" names a loan by id; "entry_key" names one by the key of the
+create that made it, in the same batch or an earlier one.
+
+The whole batch is one transaction. Creates are applied first, then interest,
+then releases, each with one bulk write and one AuditLog insert. Every
+outcome except an error (invalid fields, or an entry_key with no entry yet)
+is stored under its key, so resending a batch after a lost response replays
+the stored results and writes nothing, while corrected operations apply.
+Stored outcomes are kept for IdempotencyKey.RETENTION.
+
+Devices sign in with the session cookie, so the endpoint checks CSRF like
+any form post: send the csrftoken cookie's value in the X-CSRFToken header.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .forms import EntryForm, InterestCalculationForm
+from .models import Entry, IdempotencyKey
+
+MAX_OPERATIONS = 500
+MAX_ENTRY_ID = 2 ** 63 - 1  # bigint
+OPERATIONS = ('create', 'interest', 'release')
+
+
+class BatchError(Exception):
+    """The batch as a whole is malformed; nothing was applied."""
+
+
+def _check(operation):
+    """Error message for an operation that cannot be keyed or dispatched, else None"""
+    if not isinstance(operation, dict):
+        return 'Operation must be an object.'
+    key = operation.get('key')
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        return 'key must be a string of 1 to 64 characters.'
+    if operation.get('op') not in OPERATIONS:
+        return f"op must be one of {', '.join(OPERATIONS)}."
+    if operation['op'] == 'create':
+        if not isinstance(operation.get('data', {}), dict):
+            return 'data must be an object.'
+    else:
+        if 'entry' in operation:
+            entry = operation['entry']
+            if type(entry) is not int or not 0 < entry <= MAX_ENTRY_ID:
+                return 'entry must be an entry id.'
+        elif not isinstance(operation.get('entry_key'), str):
+            return 'entry or entry_key is required.'
+    return None
+
+
+def apply_batch(user, operations):
+    """Apply operations for user and return one result dict per operation, in order"""
+    if not isinstance(operations, list):
+        raise BatchError('operations must be a list.')
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'A batch can hold at most {MAX_OPERATIONS} operations.')
+
+    results = [None] * len(operations)
+    first_by_key = {}
+    repeats = []
+    for index, operation in enumerate(operations):
+        error = _check(operation)
+        if error:
+            key = operation.get('key') if isinstance(operation, dict) else None
+            results[index] = {'key': key, 'status': 'error', 'errors': {'__all__': [error]}}
+        elif operation['key'] in first_by_key:
+            repeats.append((index, first_by_key[operation['key']]))
+        else:
+            first_by_key[operation['key']] = index
+
+    with transaction.atomic():
+        stored = IdempotencyKey.objects.filter(user=user, key__in=list(first_by_key))
+        for row in stored:
+            results[first_by_key.pop(row.key)] = dict(row.result, replayed=True)
+
+        pending = {key: operations[index] for key, index in first_by_key.items()}
+        outcomes = {}
+        created = _apply_creates(user, pending, outcomes)
+        entry_ids = _resolve_entries(user, pending, created)
+        _apply_interest(user, pending, entry_ids, outcomes)
+        _apply_releases(user, pending, entry_ids, outcomes)
+
+        # A concurrent retry of the same batch fails here on the unique
+        # (user, key) constraint and rolls back everything above
+        IdempotencyKey.objects.bulk_create([
+            IdempotencyKey(user=user, key=key, operation=pending[key]['op'], result=result)
+            for key, result in outcomes.items()
+            if result['status'] != 'error'
+        ])
+
+    for key, result in outcomes.items():
+        results[first_by_key[key]] = result
+    for index, first in repeats:
+        results[index] = dict(results[first], replayed=True)
+    return results
+
+
+def _unresolved(key):
+    # Not stored, so a retry after the create has been fixed applies the operation
+    message = 'No entry has been created under entry_key.'
+    return _result(key, 'error', errors={'entry_key': [{'message': message, 'code': 'unknown'}]})
+
+
+def _result(key, status, entry=None, errors=None):
+    result = {'key': key, 'status': status}
+    if entry is not None:
+        result['entry'] = entry
+    if errors:
+        result['errors'] = errors
+    return result
+
+
+def _apply_creates(user, pending, outcomes):
+    """Insert the valid creates; returns {key: entry id}"""
+    entries = {}
+    for key, operation in pending.items():
+        if operation['op'] != 'create':
+            continue
+        form = EntryForm(operation.get('data') or {})
+        if form.is_valid():
+            entries[key] = form.save(commit=False)
+        else:
+            outcomes[key] = _result(key, 'error', errors=form.errors.get_json_data())
+    Entry.create_many(list(entries.values()), user)
+    for key, entry in entries.items():
+        outcomes[key] = _result(key, 'created', entry.pk)
+    return {key: entry.pk for key, entry in entries.items()}
+
+
+def _resolve_entries(user, pending, created):
+    """{key: entry id} for the interest and release operations that name a known entry"""
+    wanted = {
+        operation['entry_key']
+        for operation in pending.values()
+        if operation['op'] != 'create' and 'entry' not in operation and operation['entry_key'] not in created
+    }
+    earlier = {
+        row.key: row.result.get('entry')
+        for row in IdempotencyKey.objects.filter(user=user, operation='create', key__in=wanted)
+    }
+    entry_ids = {}
+    for key, operation in pending.items():
+        if operation['op'] == 'create':
+            continue
+        if 'entry' in operation:
+            entry_ids[key] = operation['entry']
+        else:
+            entry_ids[key] = created.get(operation['entry_key'], earlier.get(operation['entry_key']))
+    return entry_ids
+
+
+def _apply_interest(user, pending, entry_ids, outcomes):
+    groups = defaultdict(list)
+    for key, operation in pending.items():
+        if operation['op'] != 'interest':
+            continue
+        form = InterestCalculationForm(operation)
+        if not form.is_valid():
+            outcomes[key] = _result(key, 'error', errors=form.errors.get_json_data())
+        elif entry_ids[key] is None:
+            outcomes[key] = _unresolved(key)
+        else:
+            cleaned = form.cleaned_data
+            groups[cleaned['daily_rate'], cleaned['annual_rate'], cleaned['to_date']].append(key)
+
+    for (daily_rate, annual_rate, to_date), keys in groups.items():
+        updated, _ = Entry.record_interest_many(
+            [entry_ids[key] for key in keys], daily_rate, to_date, user, Entry.objects.filter(user=user), annual_rate
+        )
+        updated = set(updated)
+        for key in keys:
+            status = 'interest_recorded' if entry_ids[key] in updated else 'skipped'
+            outcomes[key] = _result(key, status, entry_ids[key])
+
+
+def _apply_releases(user, pending, entry_ids, outcomes):
+    keys = [key for key, operation in pending.items() if operation['op'] == 'release']
+    for key in keys:
+        if entry_ids[key] is None:
+            outcomes[key] = _unresolved(key)
+    keys = [key for key in keys if key not in outcomes]
+
+    released, _ = Entry.release_many(
+        [entry_ids[key] for key in keys], user, Entry.objects.filter(user=user)
+    )
+    released = set(released)
+    for key in keys:
+        entry = entry_ids[key]
+        # An entry is released once however many operations in the batch ask for it
+        outcomes[key] = _result(key, 'released' if entry in released else 'skipped', entry)
+        released.discard(entry)
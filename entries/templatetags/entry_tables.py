@@ -0,0 +1,53 @@
+"""
+{% cached_rows %} renders a table body one row template per entry and keeps
+each row's HTML in the "fragments" cache. A row's key is its template, the
+entry's pk and updated_at, plus the columns that can change without
+touching updated_at: joined ones (username) and customer_id, which
+backfill_customers sets with a plain UPDATE. A save, release or bulk update
+re-renders just the rows it touched. Any other write that skips updated_at
+must add its column to UNTIMED_COLUMNS.
+"""
+import hashlib
+
+from django import template
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from entries.rows import RELATED
+
+register = template.Library()
+
+# Row columns that can change while updated_at stays the same
+UNTIMED_COLUMNS = (*RELATED, 'customer_id')
+
+
+def _source_version(row_template):
+    """Short digest of the row template's source, so editing it retires old fragments"""
+    return hashlib.md5(row_template.template.source.encode()).hexdigest()[:8]
+
+
+def row_key(template_name, version, row):
+    untimed = ':'.join(str(getattr(row, name)) for name in UNTIMED_COLUMNS if name in row._fields)
+    return f'row:{template_name}:{version}:{row.pk}:{row.updated_at.isoformat()}:{untimed}'
+
+
+@register.simple_tag
+def cached_rows(rows, template_name):
+    """Concatenated HTML of template_name rendered for each row (as `entry`)"""
+    row_template = get_template(template_name)
+    version = _source_version(row_template)
+    rows = list(rows)
+    keys = [row_key(template_name, version, row) for row in rows]
+
+    cache = caches['fragments']
+    fragments = cache.get_many(keys)
+    rendered = {}
+    for key, row in zip(keys, rows):
+        if key not in fragments:
+            fragments[key] = rendered[key] = row_template.render({'entry': row})
+    if rendered:
+        # Timeout and size are set on the cache in settings.CACHES
+        cache.set_many(rendered)
+
+    return mark_safe(''.join(fragments[key] for key in keys))
@@ -0,0 +1,75 @@
+"""
+Test helpers for catching N+1 queries.
+
+record_queries() logs every query a block of code runs together with the
+template line that was rendering at the time, so a failing query budget can
+point at the {{ entry.user.username }} that caused it.
+"""
+import re
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connections
+from django.template.base import Node
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_sql(sql):
+    """Replace literals so the same statement with different values compares equal."""
+    return LITERALS.sub('?', sql)
+
+
+def _template_location():
+    """template:line of the innermost template node being rendered, if any."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if frame.f_code.co_name == 'render_annotated' and isinstance(node, Node):
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((normalize_sql(sql), _template_location()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self):
+        """[(count, sql, template locations)] for statements run more than once, most frequent first."""
+        locations = defaultdict(list)
+        for sql, location in self.queries:
+            locations[sql].append(location)
+        return sorted(
+            (
+                (len(where), sql, sorted({location or '(view code)' for location in where}))
+                for sql, where in locations.items()
+                if len(where) > 1
+            ),
+            reverse=True,
+        )
+
+    def report(self, limit=5):
+        lines = [f'{len(self)} queries']
+        for count, sql, where in self.repeated()[:limit]:
+            lines.append(f'  {count}x {sql}')
+            lines.append(f"     from {', '.join(where)}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using='default'):
+    log = QueryLog()
+    with connections[using].execute_wrapper(log):
+        yield log
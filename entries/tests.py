@@ -1,3 +1,981 @@
-from django.test import TestCase
+import asyncio
+import json
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.template.base import Template
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from .management.commands.scan_maturities import MILESTONES, milestone_for
+from .models import (
+    AUDIT_FIELDS, AllEntry, ArchivedEntry, AuditLog, Customer, Entry, IdempotencyKey, MaturityAlert, MaturityScan,
+    PortfolioSnapshot, audit_state_from_values,
+)
+from . import reports, rows
+from .live import DashboardFeed
+from .portfolio import portfolio_as_of, take_snapshot
+from .startup import heavy_modules_loaded, profile_startup
+from .testing import record_queries
+
+User = get_user_model()
+
+
+def make_entry(user, serial_number, **fields):
+    values = {
+        'date': date(2025, 1, 1), 'customer_name': 'Customer', 'amount': Decimal('1000.00'),
+        'weight': Decimal('10.00'), 'given_by': 'Branch',
+    }
+    values.update(fields)
+    return Entry.objects.create(user=user, serial_number=serial_number, **values)
+
+
+class StartupBudgetTests(SimpleTestCase):
+    def test_worker_entry_points_within_budget(self):
+        budget = settings.STARTUP_BUDGET
+        for module in ('entry_management.wsgi', 'entry_management.asgi'):
+            with self.subTest(module=module):
+                profile = profile_startup(module)
+                self.assertEqual(heavy_modules_loaded(profile['modules']), [])
+                self.assertLessEqual(profile['seconds'], budget['seconds'])
+                if profile['rss_kb'] is not None:
+                    self.assertLessEqual(profile['rss_kb'] / 1024, budget['rss_mb'])
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every page must run a fixed number of queries however many rows it
+    shows: render each view over N and 10N rows and compare.
+    """
+    N = 3
+
+    # url name -> (kwargs, query string, max queries)
+    BUDGETS = {
+        'entry_create': ({}, '', 3),
+        'entry_list': ({}, '', 4),
+        'entry_edit': (lambda t: {'pk': t.active_entry.pk}, '', 4),
+        'calculate_interest': (lambda t: {'pk': t.active_entry.pk}, '', 4),
+        'admin_dashboard': ({}, '', 10),
+        'released_entries': ({}, '', 4),
+        'customer_list': ({}, '', 4),
+        'customer_detail': (lambda t: {'pk': t.active_entry.customer_id}, '', 7),
+        'portfolio': ({}, '?as_of=2030-01-01', 5),
+        'export_to_excel': ({}, '', 4),
+        'entry_reports': ({}, '', 7),
+        'register': ({}, '', 3),
+        'pending_users': ({}, '', 4),
+    }
+    # Views that change data on GET, only accept POST, or stream forever
+    SKIPPED = {
+        'release_entry', 'bulk_release', 'bulk_calculate_interest', 'sync_batch',
+        'dashboard_events', 'approve_user',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            'staff', password='pw', is_staff=True, is_superuser=True, is_approved=True
+        )
+        cls.tellers = [
+            User.objects.create_user(f'teller{i}', password='pw', is_approved=True) for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def seed(self, n):
+        """Add n more rows of every kind the views list"""
+        start = Entry.objects.count() + ArchivedEntry.objects.count()
+        for i in range(start, start + n):
+            user = (self.staff, *self.tellers)[i % 3]
+            entry = Entry.objects.create(
+                user=user,
+                date=date(2025, 1, 1) + timedelta(days=i),
+                serial_number=f'SN{i:04d}',
+                customer_name=f'Customer {i % 2}',
+                amount=Decimal('1000.00'),
+                weight=Decimal('10.000'),
+                given_by='Branch',
+            )
+            AuditLog.record(entry, user, 'create', 'Entry created')
+            if i % 3 == 1:
+                before = entry.audit_state()
+                entry.release()
+                AuditLog.record(entry, user, 'release', 'Entry released', before)
+            else:
+                MaturityAlert.objects.create(entry=entry, kind='overdue', trigger_date=entry.from_date)
+            ArchivedEntry.objects.create(
+                id=100000 + i,
+                user=user,
+                customer=entry.customer,
+                date=entry.date,
+                from_date=entry.from_date,
+                serial_number=f'AR{i:04d}',
+                customer_name=entry.customer_name,
+                amount=entry.amount,
+                weight=entry.weight,
+                given_by=entry.given_by,
+                status='released',
+                created_at=entry.created_at,
+                updated_at=entry.updated_at,
+                released_at=entry.updated_at,
+            )
+            User.objects.create(username=f'pending{i}')
+        take_snapshot()
+        self.active_entry = Entry.objects.filter(user=self.staff, status='active').earliest('id')
+
+    def render_all(self):
+        counts = {}
+        for name, (kwargs, query, budget) in self.BUDGETS.items():
+            if callable(kwargs):
+                kwargs = kwargs(self)
+            with record_queries() as log:
+                response = self.client.get(reverse(name, kwargs=kwargs) + query)
+                b''.join(response)
+            self.assertEqual(response.status_code, 200, name)
+            counts[name] = log
+        return counts
+
+    def test_views_are_covered(self):
+        names = {
+            pattern.name
+            for module in ('entries.urls', 'users.urls')
+            for pattern in get_resolver(module).url_patterns
+        }
+        self.assertEqual(names - self.SKIPPED, set(self.BUDGETS))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(self.N)
+        small = self.render_all()
+        self.seed(self.N * 9)
+        large = self.render_all()
+
+        failures = []
+        for name, (kwargs, query, budget) in self.BUDGETS.items():
+            if len(large[name]) > len(small[name]):
+                failures.append(
+                    f'{name}: {len(small[name])} queries over {self.N} rows, '
+                    f'{len(large[name])} over {self.N * 10}\n{large[name].report()}'
+                )
+            elif len(large[name]) > budget:
+                failures.append(f'{name}: over budget of {budget}\n{large[name].report()}')
+        if failures:
+            self.fail('\n\n'.join(failures))
+
+
+class RowFragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['fragments'].clear()
+        self.user = User.objects.create_user('staff', password='pw', is_staff=True, is_approved=True)
+        self.client.force_login(self.user)
+        self.entries = [
+            Entry.objects.create(
+                user=self.user, date=date(2025, 1, 1), serial_number=f'SN{i}', customer_name='Customer',
+                amount=Decimal('1000.00'), weight=Decimal('10.000'), given_by='Branch',
+            )
+            for i in range(3)
+        ]
+
+    def rendered_rows(self):
+        with patch.object(Template, 'render', autospec=True, side_effect=Template.render) as render:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return [
+            call.args[1]['entry'].serial_number
+            for call in render.call_args_list
+            if call.args[0].origin.template_name == 'entries/dashboard_row.html'
+        ]
+
+    def test_only_changed_rows_are_rendered_again(self):
+        self.assertEqual(sorted(self.rendered_rows()), ['SN0', 'SN1', 'SN2'])
+        self.assertEqual(self.rendered_rows(), [])
+
+        self.entries[1].release()
+        Entry.release_many([self.entries[2].pk], self.user)
+        self.assertEqual(sorted(self.rendered_rows()), ['SN1', 'SN2'])
+
+    def test_customer_backfill_rerenders_rows(self):
+        self.rendered_rows()
+        # What backfill_customers does: set customer_id without touching updated_at
+        Entry.objects.filter(pk=self.entries[0].pk).update(customer=None)
+        self.assertEqual(self.rendered_rows(), ['SN0'])
+
+
+class SyncBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True)
+        self.client.force_login(self.user)
+
+    def post(self, operations):
+        response = self.client.post(
+            reverse('sync_batch'), json.dumps({'operations': operations}), content_type='application/json'
+        )
+        return response.status_code, response.json()
+
+    def test_retried_batch_replays_results(self):
+        data = {
+            'date': '2025-01-01', 'amount': '1000.00', 'serial_number': 'SN1', 'weight': '10.00',
+            'customer_name': 'Ravi  Kumar', 'given_by': 'Branch',
+        }
+        operations = [
+            {'key': 'c1', 'op': 'create', 'data': data},
+            {'key': 'c2', 'op': 'create', 'data': dict(data, serial_number='SN2', customer_name='ravi kumar')},
+            {'key': 'i1', 'op': 'interest', 'entry_key': 'c1', 'rate_type': '12', 'to_date': '2025-03-01'},
+            {'key': 'r1', 'op': 'release', 'entry_key': 'c1'},
+            {'key': 'r2', 'op': 'release', 'entry_key': 'c1'},
+            {'key': 'bad', 'op': 'create', 'data': dict(data, amount='')},
+        ]
+        status, body = self.post(operations)
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            ['created', 'created', 'interest_recorded', 'released', 'skipped', 'error'],
+        )
+        self.assertIn('amount', body['results'][5]['errors'])
+
+        first = Entry.objects.get(pk=body['results'][0]['entry'])
+        self.assertEqual(first.status, 'released')
+        self.assertEqual(first.interest_amount, Decimal('19.41'))
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(AuditLog.objects.count(), 4)
+
+        status, retry = self.post(operations + [{'key': 'r3', 'op': 'release', 'entry_key': 'c2'}])
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [result.get('replayed', False) for result in retry['results']],
+            [True, True, True, True, True, False, False],
+        )
+        self.assertEqual(retry['results'][6]['status'], 'released')
+        self.assertEqual(Entry.objects.count(), 2)
+        self.assertEqual(AuditLog.objects.count(), 5)
+
+    def test_malformed_batch_is_rejected(self):
+        self.assertEqual(self.post('not a list')[0], 400)
+        status, body = self.post([
+            {'key': 'a', 'op': 'delete'},
+            {'key': 'b', 'op': 'release', 'entry': '3'},
+            {'key': 'c', 'op': 'release', 'entry': 10 ** 20},
+            {'key': 'd', 'op': 'create', 'data': ['not', 'an', 'object']},
+            {'key': 'e', 'op': 'interest', 'entry': 1},
+            {'key': 'f', 'op': 'interest', 'entry': 1, 'rate_type': 'bogus'},
+        ])
+        self.assertEqual(status, 200)
+        self.assertEqual([result['status'] for result in body['results']], ['error'] * 6)
+        self.assertIn('rate_type', body['results'][4]['errors'])
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_unresolved_entry_key_applies_on_corrected_retry(self):
+        data = {
+            'date': '2025-01-01', 'amount': '1000.00', 'serial_number': 'SN1', 'weight': '10.00',
+            'customer_name': 'Ravi Kumar', 'given_by': 'Branch',
+        }
+        release = {'key': 'r1', 'op': 'release', 'entry_key': 'c1'}
+        status, body = self.post([{'key': 'c1', 'op': 'create', 'data': dict(data, amount='')}, release])
+        self.assertEqual([result['status'] for result in body['results']], ['error', 'error'])
+        self.assertIn('entry_key', body['results'][1]['errors'])
+
+        status, body = self.post([{'key': 'c1', 'op': 'create', 'data': data}, release])
+        self.assertEqual([result['status'] for result in body['results']], ['created', 'released'])
+        self.assertEqual(Entry.objects.get().status, 'released')
+
+    def test_auth_and_csrf_failures_are_json(self):
+        url = reverse('sync_batch')
+        body = json.dumps({'operations': []})
+        self.client.logout()
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()), (401, {'error': 'Authentication required.'}))
+
+        self.client.force_login(User.objects.create_user('new', password='pw'))
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+        device = Client(enforce_csrf_checks=True)
+        device.force_login(self.user)
+        response = device.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['error'])
+        device.get(reverse('login'))
+        token = device.cookies['csrftoken'].value
+        response = device.post(url, body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual((response.status_code, response.json()), (200, {'results': []}))
+
+    def test_expired_keys_are_cleared(self):
+        self.post([{'key': 'r1', 'op': 'release', 'entry': make_entry(self.user, 'SN1').pk}])
+        self.post([{'key': 'r2', 'op': 'release', 'entry': make_entry(self.user, 'SN2').pk}])
+        IdempotencyKey.objects.filter(key='r1').update(created_at=timezone.now() - IdempotencyKey.RETENTION)
+        call_command('clear_idempotency_keys', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['r2'])
+
+
+def reference_interest(amount, daily_rate, days):
+    """Entry.calculate_interest as it was before the factor cache, for comparison"""
+    daily_rate_decimal = Decimal(str(daily_rate)) / Decimal('100')
+    days_decimal = Decimal(str(days))
+    if days >= Entry.COMPOUND_INTEREST_DAYS:
+        interest = amount * ((Decimal('1') + daily_rate_decimal) ** days_decimal - Decimal('1'))
+    else:
+        interest = amount * daily_rate_decimal * days_decimal
+    return round(interest, 2)
+
+
+class InterestFactorCacheTests(SimpleTestCase):
+    def test_matches_uncached_calculation_exactly(self):
+        form_rates = [round(Decimal(rate) / Decimal('365'), 4) for rate in ('12', '13.8')]
+        rng = random.Random(20251019)
+        for _ in range(3000):
+            daily_rate = rng.choice(form_rates + [
+                Decimal(rng.randrange(1, 1000000)).scaleb(-4),
+                Decimal(rng.randrange(1, 500)).scaleb(-2).quantize(Decimal('0.0000')),
+                str(Decimal(rng.randrange(1, 10000)).scaleb(-4)),
+                rng.randrange(1, 10000) / 10000,
+            ])
+            amount = Decimal(rng.randrange(1, 10 ** 10)).scaleb(-2)
+            days = rng.choice([rng.randrange(0, 400), rng.randrange(360, 3700)])
+            entry = Entry(amount=amount, from_date=date(2020, 1, 1), to_date=date(2020, 1, 1) + timedelta(days=days))
+            expected = self.outcome(reference_interest, amount, daily_rate, max(days, Entry.MIN_INTEREST_DAYS))
+            with self.subTest(amount=amount, daily_rate=daily_rate, days=days):
+                # Twice: the second call is served from the factor cache
+                for _ in range(2):
+                    self.assertEqual(self.outcome(entry.calculate_interest, daily_rate), expected)
+
+    def outcome(self, function, *args):
+        """str of the result, or the exception type for rates that overflow 28 digits"""
+        try:
+            return str(function(*args))
+        except ArithmeticError as e:
+            return type(e)
+
+
+class BulkActionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True)
+        self.other = User.objects.create_user('other', password='pw', is_approved=True)
+        self.client.force_login(self.user)
+        self.mine = [make_entry(self.user, f'SN{i}') for i in range(2)]
+        self.released = make_entry(self.user, 'SN-R', status='released')
+        self.theirs = make_entry(self.other, 'SN-O')
+
+    def selected(self):
+        return [entry.pk for entry in (*self.mine, self.released, self.theirs)]
+
+    def test_bulk_release_skips_inactive_and_other_users_entries(self):
+        response = self.client.post(reverse('bulk_release'), {'selected': self.selected()}, follow=True)
+        self.assertRedirects(response, reverse('entry_list'))
+        self.assertEqual(
+            set(Entry.objects.filter(status='released').values_list('pk', flat=True)),
+            {self.mine[0].pk, self.mine[1].pk, self.released.pk},
+        )
+        self.assertEqual(AuditLog.objects.filter(action='release').count(), 2)
+        warning = [str(m) for m in response.context['messages'] if m.level_tag == 'warning']
+        self.assertEqual(warning, [f'Skipped entries that are not active or not yours: {self.released.pk}, {self.theirs.pk}'])
+
+    def test_bulk_calculate_interest(self):
+        data = {'selected': self.selected(), 'rate_type': '12', 'to_date': '2025-03-01'}
+        self.client.post(reverse('bulk_calculate_interest'), data)
+        interest = dict(Entry.objects.values_list('pk', 'interest_amount'))
+        self.assertEqual(interest[self.mine[0].pk], Decimal('19.41'))
+        self.assertEqual(interest[self.mine[1].pk], Decimal('19.41'))
+        self.assertIsNone(interest[self.released.pk])
+        self.assertIsNone(interest[self.theirs.pk])
+        self.assertEqual(AuditLog.objects.filter(action='calculate_interest').count(), 2)
+
+    def test_bulk_calculate_interest_without_rate_type(self):
+        response = self.client.post(reverse('bulk_calculate_interest'), {'selected': self.selected()})
+        self.assertRedirects(response, reverse('entry_list'))
+        self.assertFalse(Entry.objects.exclude(interest_amount=None).exists())
+
+    def test_bulk_views_require_post(self):
+        self.assertEqual(self.client.get(reverse('bulk_release')).status_code, 405)
+        self.assertEqual(self.client.get(reverse('bulk_calculate_interest')).status_code, 405)
+
+    def test_admin_actions(self):
+        admin_user = User.objects.create_superuser('admin', password='pw', is_approved=True)
+        self.client.force_login(admin_user)
+        url = reverse('admin:entries_entry_changelist')
+        selected = [self.mine[0].pk, self.released.pk, self.theirs.pk]
+
+        self.client.post(url, {'action': 'record_interest_12', '_selected_action': selected})
+        self.assertEqual(
+            set(Entry.objects.exclude(interest_amount=None).values_list('pk', flat=True)),
+            {self.mine[0].pk, self.theirs.pk},
+        )
+        self.client.post(url, {'action': 'release_selected', '_selected_action': selected})
+        self.assertEqual(
+            set(Entry.objects.filter(status='active').values_list('pk', flat=True)), {self.mine[1].pk}
+        )
+        self.assertEqual(AuditLog.objects.filter(user=admin_user).count(), 4)
+
+
+class MaturityScanTests(TestCase):
+    FIRST = date(2025, 6, 1)
+    SECOND = date(2025, 8, 15)
+
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True)
+        self.entries = [make_entry(self.user, f'SN{i}', date=date(2024, 3, 1) + timedelta(days=7 * i)) for i in range(75)]
+        # Loans that reach a milestone exactly on, or a day either side of, each scan date
+        for through in (self.FIRST, self.SECOND):
+            for kind, days in MILESTONES:
+                for shift in (-1, 0, 1):
+                    make_entry(self.user, f'SN-{through}-{kind}{shift}', date=through - timedelta(days=days + shift))
+
+    def scan(self, through, *args):
+        call_command('scan_maturities', '--through', through.isoformat(), '--chunk-days', '20', *args, stdout=StringIO())
+
+    def assertWorklist(self, through):
+        expected = {}
+        for pk, from_date in Entry.objects.filter(status='active').values_list('pk', 'from_date'):
+            milestone = milestone_for(from_date, through)
+            if milestone:
+                expected[pk] = milestone
+        worklist = MaturityAlert.objects.values_list('entry_id', 'kind', 'trigger_date')
+        self.assertEqual({pk: (kind, trigger_date) for pk, kind, trigger_date in worklist}, expected)
+
+    def test_incremental_scans_match_milestone_for(self):
+        self.scan(self.FIRST)
+        self.assertWorklist(self.FIRST)
+
+        released = self.entries[40]
+        released.status = 'released'
+        released.save()
+        # Back-dated, re-dated and newly added loans fall outside the date windows
+        back_dated = self.entries[70]
+        back_dated.date = date(2024, 1, 2)
+        back_dated.save()
+        forward = self.entries[10]
+        forward.date = self.SECOND - timedelta(days=5)
+        forward.save()
+        make_entry(self.user, 'SN-NEW', date=date(2023, 12, 1))
+
+        self.scan(self.SECOND)
+        self.assertWorklist(self.SECOND)
+        self.assertFalse(MaturityAlert.objects.filter(entry__in=[released, forward]).exists())
+        self.assertEqual(MaturityAlert.objects.get(entry=back_dated).kind, 'overdue')
+        self.assertEqual(MaturityScan.objects.count(), 2)
+
+    def test_full_rebuilds_the_worklist(self):
+        self.scan(self.FIRST)
+        MaturityAlert.objects.update(kind='due')
+        MaturityAlert.objects.first().delete()
+
+        self.scan(self.FIRST)
+        self.assertFalse(MaturityAlert.objects.exclude(kind='due').exists())
+        self.assertEqual(MaturityScan.objects.count(), 1)
+
+        self.scan(self.FIRST, '--full')
+        self.assertWorklist(self.FIRST)
+
+
+class ArchiveEntriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True)
+        self.active = make_entry(self.user, 'SN-A')
+        self.recent = make_entry(self.user, 'SN-N', status='released')
+        self.closed = [make_entry(self.user, f'SN{i}', status='released') for i in range(3)]
+        for entry in (self.active, *self.closed):
+            AuditLog.record(entry, self.user, 'create', 'Entry created')
+        Entry.objects.exclude(pk=self.recent.pk).update(updated_at=timezone.now() - timedelta(days=40))
+
+    def archive(self, *args):
+        call_command('archive_entries', '--batch-size', '2', *args, stdout=StringIO())
+
+    def test_moves_closed_entries_and_keeps_their_history(self):
+        before = {row['id']: row for row in AllEntry.objects.values()}
+        self.archive()
+        closed = {entry.pk for entry in self.closed}
+        self.assertEqual(set(ArchivedEntry.objects.values_list('pk', flat=True)), closed)
+        self.assertEqual(set(Entry.objects.values_list('pk', flat=True)), {self.active.pk, self.recent.pk})
+        after = {row['id']: row for row in AllEntry.objects.values()}
+        for row in after.values():
+            row['archived_at'] = None
+        self.assertEqual(after, {pk: dict(row, archived_at=None) for pk, row in before.items()})
+
+        logs = AuditLog.objects.filter(loan_id__in=closed)
+        self.assertEqual(logs.count(), 3)
+        self.assertFalse(logs.exclude(entry=None).exists())
+        self.assertEqual({log.loan.serial_number for log in logs}, {'SN0', 'SN1', 'SN2'})
+
+    def test_batch_is_copied_and_deleted_in_one_transaction(self):
+        with patch.object(QuerySet, 'delete', side_effect=DatabaseError('lock timeout')):
+            with self.assertRaises(DatabaseError):
+                self.archive()
+        self.assertFalse(ArchivedEntry.objects.exists())
+        self.assertEqual(Entry.objects.count(), 5)
+
+    def test_limit(self):
+        self.archive('--limit', '1')
+        self.assertEqual(ArchivedEntry.objects.get().pk, self.closed[0].pk)
+
+    def test_deleting_an_entry_keeps_its_log_without_a_dangling_reference(self):
+        pk = self.active.pk
+        self.active.delete()
+        log = AuditLog.objects.get(loan_id=pk)
+        self.assertIsNone(log.entry_id)
+
+    def test_admin_search_finds_archived_loans(self):
+        self.archive()
+        admin_user = User.objects.create_superuser('admin', password='pw', is_approved=True)
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:entries_auditlog_changelist'), {'q': 'SN1'})
+        self.assertEqual([log.loan_id for log in response.context['cl'].result_list], [self.closed[1].pk])
+
+
+class EntryCustomerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True)
+        self.entry = make_entry(self.user, 'SN1', customer_name='Ravi Kumar')
+
+    def test_save_skips_customer_lookup_when_name_is_unchanged(self):
+        entry = Entry.objects.get(pk=self.entry.pk)
+        entry.amount = Decimal('1500.00')
+        with self.assertNumQueries(1):
+            entry.save()
+        with self.assertNumQueries(1):
+            self.entry.save()
+
+    def test_save_relinks_customer_when_name_changes(self):
+        customer = self.entry.customer
+        entry = Entry.objects.get(pk=self.entry.pk)
+        entry.customer_name = 'Asha Rao'
+        entry.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.customer.name, 'Asha Rao')
+        # Unlinked rows (not yet backfilled) are resolved on save
+        Entry.objects.filter(pk=entry.pk).update(customer=None, customer_name='ravi  kumar')
+        entry = Entry.objects.get(pk=entry.pk)
+        entry.save()
+        self.assertEqual(entry.customer, customer)
+
+    def test_names_differing_in_case_and_spacing_share_a_customer(self):
+        names = ['Ravi  Kumar', ' ravi kumar', 'RAVI KUMAR\t']
+        customers = {Customer.for_name(name) for name in names}
+        customers |= set(Customer.for_names(names + ['Straße', 'STRASSE']).values())
+        self.assertEqual(
+            sorted(customers, key=lambda c: c.pk), [self.entry.customer, Customer.objects.get(normalized_name='strasse')]
+        )
+        self.assertEqual(self.entry.customer.name, 'Ravi Kumar')
+
+    def test_backfill_links_live_and_archived_entries(self):
+        make_entry(self.user, 'SN2', customer_name='ravi   KUMAR')
+        make_entry(self.user, 'SN3', customer_name='Asha Rao', status='released')
+        make_entry(self.user, 'SN4', customer_name='asha rao')
+        Entry.objects.filter(serial_number='SN3').update(updated_at=timezone.now() - timedelta(days=40))
+        call_command('archive_entries', stdout=StringIO())
+        Entry.objects.update(customer=None)
+        ArchivedEntry.objects.update(customer=None)
+        Customer.objects.exclude(pk=self.entry.customer_id).delete()
+
+        call_command('backfill_customers', '--batch-size', '1', stdout=StringIO())
+        linked = dict(AllEntry.objects.values_list('serial_number', 'customer__normalized_name'))
+        self.assertEqual(linked, {'SN1': 'ravi kumar', 'SN2': 'ravi kumar', 'SN3': 'asha rao', 'SN4': 'asha rao'})
+        self.assertEqual(Customer.objects.count(), 2)
+        # Live entries are linked first, so their spelling names the customer
+        self.assertEqual(Customer.objects.get(normalized_name='asha rao').name, 'asha rao')
+
+    def test_admin_keeps_the_normalized_name(self):
+        admin_user = User.objects.create_superuser('admin', password='pw', is_approved=True)
+        self.client.force_login(admin_user)
+        customer = self.entry.customer
+        Customer.for_name('Asha Rao')
+        change_url = reverse('admin:entries_customer_change', args=[customer.pk])
+        add_url = reverse('admin:entries_customer_add')
+
+        for name in ('Asha Rao', 'Ravi Kumaar'):
+            response = self.client.post(change_url, {'name': name})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['adminform'].form.errors)
+        response = self.client.post(add_url, {'name': 'asha  rao'})
+        self.assertTrue(response.context['adminform'].form.errors)
+
+        self.assertEqual(self.client.post(change_url, {'name': 'RAVI kumar'}).status_code, 302)
+        self.assertEqual(self.client.post(add_url, {'name': ' Meena  Iyer'}).status_code, 302)
+        self.assertEqual(
+            set(Customer.objects.values_list('name', 'normalized_name')),
+            {('RAVI kumar', 'ravi kumar'), ('Asha Rao', 'asha rao'), ('Meena Iyer', 'meena iyer')},
+        )
+        make_entry(self.user, 'SN2', customer_name='Ravi Kumar')
+        self.assertEqual(Customer.objects.count(), 3)
+
+
+class TotalAmountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='pw', is_approved=True, is_staff=True)
+        self.client.force_login(self.user)
+        self.small = make_entry(self.user, 'SN1', amount=Decimal('500.00'))
+        self.large = make_entry(self.user, 'SN2', amount=Decimal('2000.00'))
+        self.closed = make_entry(self.user, 'SN3', amount=Decimal('1500.00'), interest_amount=Decimal('600.00'),
+                                 status='released')
+
+    def test_generated_column(self):
+        Entry.record_interest_many([self.small.pk], Decimal('0.0329'), date(2025, 3, 1), self.user)
+        totals = dict(Entry.objects.values_list('pk', 'total_amount'))
+        self.assertEqual(totals, {
+            self.small.pk: Decimal('509.71'), self.large.pk: Decimal('2000.00'), self.closed.pk: Decimal('2100.00'),
+        })
+        Entry.objects.filter(pk=self.closed.pk).update(updated_at=timezone.now() - timedelta(days=40))
+        call_command('archive_entries', stdout=StringIO())
+        self.assertEqual(AllEntry.objects.get(pk=self.closed.pk).total_amount, Decimal('2100.00'))
+
+    def test_calculate_interest_shows_the_stored_total(self):
+        response = self.client.post(
+            reverse('calculate_interest', args=[self.large.pk]), {'rate_type': '12', 'to_date': '2025-03-01'}
+        )
+        result = response.context['calculation_result']
+        self.assertEqual(result['total_amount'], Entry.objects.get(pk=self.large.pk).total_amount)
+        self.assertEqual(result['total_amount'], Decimal('2000.00') + result['interest_amount'])
+
+    def dashboard(self, **params):
+        response = self.client.get(reverse('admin_dashboard'), params)
+        return [row.pk for row in response.context['entries']]
+
+    def test_dashboard_filters_on_total_amount(self):
+        self.assertEqual(set(self.dashboard(total_min='2000')), {self.large.pk, self.closed.pk})
+        self.assertEqual(self.dashboard(total_min='1000', total_max='2000'), [self.large.pk])
+        self.assertEqual(self.dashboard(total_max='499.99'), [])
+        self.assertEqual(self.dashboard(order_by='-total_amount'), [self.closed.pk, self.large.pk, self.small.pk])
+        self.assertEqual(self.dashboard(order_by='total_amount', status='active'), [self.small.pk, self.large.pk])
+
+    def test_invalid_filter_shows_every_entry(self):
+        self.assertEqual(len(self.dashboard(total_min='lots', order_by='-total_amount')), 3)
+
+
+class ExportTests(TestCase):
+    def test_export_streams_every_entry_into_the_sheet(self):
+        from openpyxl import load_workbook
+
+        user = User.objects.create_user('staff', password='pw', is_approved=True, is_staff=True)
+        self.client.force_login(user)
+        make_entry(user, 'SN1', interest_amount=Decimal('25.50'))
+        make_entry(user, 'SN2', customer_name='Asha Rao', status='released')
+        response = self.client.get(reverse('export_to_excel'))
+
+        ws = load_workbook(BytesIO(response.content)).active
+        self.assertEqual(ws.title, 'Entries Report')
+        sheet = list(ws.values)
+        self.assertEqual(sheet[0], tuple(heading for heading, _width in rows.EXPORT_HEADINGS))
+        self.assertEqual(
+            sorted((row[2], row[3], row[6], row[9]) for row in sheet[1:]),
+            [('SN1', 'Customer', 'active', 1025.5), ('SN2', 'Asha Rao', 'released', 1000)],
+        )
+        self.assertEqual(ws.column_dimensions['D'].width, 28)
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        self.teller = User.objects.create_user('teller', password='pw', is_approved=True)
+        self.other = User.objects.create_user('other', password='pw', is_approved=True)
+        make_entry(self.teller, 'SN1', date=date(2025, 1, 10), given_by='North')
+        make_entry(self.teller, 'SN2', date=date(2025, 1, 20), amount=Decimal('2000.00'), weight=Decimal('20.00'),
+                   given_by='South', status='released', interest_amount=Decimal('100.00'))
+        make_entry(self.other, 'SN3', date=date(2025, 2, 5), amount=Decimal('500.00'), weight=Decimal('5.00'),
+                   given_by='North', interest_amount=Decimal('50.00'))
+        make_entry(self.other, 'SN4', date=date(2025, 3, 1), amount=Decimal('1500.00'), weight=Decimal('15.00'),
+                   given_by='North', status='removed')
+        Entry.objects.exclude(status='active').update(updated_at=timezone.now() - timedelta(days=40))
+        call_command('archive_entries', stdout=StringIO())
+        self.staff = User.objects.create_user('staff', password='pw', is_approved=True, is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_totals_per_group_span_live_and_archived_entries(self):
+        self.assertEqual(ArchivedEntry.objects.count(), 2)
+        by_user = {row.pop('group'): row for row in reports.run_report('user')}
+        self.assertEqual(by_user['teller'], {
+            'loans': 2, 'active_loans': 1, 'released_loans': 1,
+            'principal': Decimal('3000.00'), 'outstanding_principal': Decimal('1000.00'),
+            'interest': Decimal('100.00'), 'released_interest': Decimal('100.00'),
+            'total_weight': Decimal('30.00'), 'active_weight': Decimal('10.00'),
+        })
+        self.assertEqual(by_user['other'], {
+            'loans': 2, 'active_loans': 1, 'released_loans': 0,
+            'principal': Decimal('2000.00'), 'outstanding_principal': Decimal('500.00'),
+            'interest': Decimal('50.00'), 'released_interest': None,
+            'total_weight': Decimal('20.00'), 'active_weight': Decimal('5.00'),
+        })
+        by_given_by = {row['group']: (row['loans'], row['principal']) for row in reports.run_report('given_by')}
+        self.assertEqual(by_given_by, {'North': (3, Decimal('3000.00')), 'South': (1, Decimal('2000.00'))})
+        by_status = {row['group']: row['loans'] for row in reports.run_report('status')}
+        self.assertEqual(by_status, {'active': 2, 'released': 1, 'removed': 1})
+
+    def test_view_filters_by_date(self):
+        response = self.client.get(
+            reverse('entry_reports'), {'report': 'month', 'date_from': '2025-01-15', 'date_to': '2025-02-28', 'format': 'json'}
+        )
+        months = {row['group'][:7]: (row['loans'], Decimal(row['principal'])) for row in response.json()['month']}
+        self.assertEqual(months, {'2025-01': (1, Decimal('2000')), '2025-02': (1, Decimal('500'))})
+
+    def test_malformed_date_is_a_bad_request(self):
+        response = self.client.get(reverse('entry_reports'), {'date_from': '2025-13-40', 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_from', response.json()['errors'])
+
+    def test_workbook(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('entry_reports'), {'report': ['user', 'status']})
+        wb = load_workbook(BytesIO(response.content))
+        self.assertEqual(wb.sheetnames, ['By User', 'By Status'])
+        sheet = list(wb['By User'].values)
+        self.assertEqual(sheet[0][:4], ('User', 'Loans', 'Active Loans', 'Released Loans'))
+        self.assertEqual([row[:5] for row in sheet[1:]], [('other', 2, 1, 0, 2000), ('teller', 2, 1, 1, 3000)])
+
+
+class AnnualRateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True, is_staff=True)
+        self.client.force_login(self.user)
+        self.entry = make_entry(self.user, 'SN1')
+
+    def annual_rates(self):
+        # Read the whole payload: SQLite's JSON key extraction turns numeric strings into numbers
+        return [payload['annual_rate'] for payload in AuditLog.objects.order_by('pk').values_list('payload', flat=True)]
+
+    def test_stores_the_chosen_annual_rate(self):
+        url = reverse('calculate_interest', args=[self.entry.pk])
+        self.client.post(url, {'rate_type': '12', 'to_date': '2025-03-01'})
+        self.client.post(url, {'rate_type': 'custom', 'daily_rate': '0.0356', 'to_date': '2025-03-01'})
+        self.client.post(reverse('bulk_calculate_interest'), {'selected': [self.entry.pk], 'rate_type': '13.8'})
+        self.client.post(reverse('sync_batch'), json.dumps({'operations': [
+            {'key': 'k1', 'op': 'interest', 'entry': self.entry.pk, 'rate_type': '12', 'to_date': '2025-03-01'},
+        ]}), content_type='application/json')
+        Entry.record_interest_many([self.entry.pk], Entry.get_daily_rate('13.8'), None, self.user, annual_rate=Decimal('13.8'))
+        self.assertEqual(self.annual_rates(), ['12', '12.9940', '13.8', '12', '13.8'])
+
+        log = AuditLog.objects.order_by('pk')[1]
+        self.assertEqual(log.payload['daily_rate'], '0.0356')
+        self.assertEqual(log.payload['amount'], '1000.00')
+        self.assertEqual(log.payload['interest_amount'], '21.00')
+
+    def test_filter_buckets_custom_rates_by_their_own_annual_rate(self):
+        for daily_rate in ('0.0329', '0.0356', '0.0378'):
+            Entry.record_interest_many([self.entry.pk], Decimal(daily_rate), None, self.user)
+        self.assertEqual(self.annual_rates(), ['12.0085', '12.9940', '13.7970'])
+        admin_user = User.objects.create_superuser('admin', password='pw', is_approved=True)
+        self.client.force_login(admin_user)
+        for bucket, expected in (('12', 3), ('13', 1), ('13.8', 0)):
+            response = self.client.get(reverse('admin:entries_auditlog_changelist'), {'annual_rate': bucket})
+            self.assertEqual(response.context['cl'].result_count, expected)
+
+    def test_backfill_rewrites_numeric_keys_and_recovers_the_form_rate(self):
+        AuditLog.objects.create(
+            entry=self.entry, user=self.user, action='calculate_interest',
+            details='Interest calculated with rate 0.0329% for 30 days',
+            payload={'new_status': 'active', 'amount': 1000.0, 'interest_amount': 9.87,
+                     'daily_rate': 0.0329, 'annual_rate': 12.01, 'days': 30},
+        )
+        AuditLog.objects.create(
+            entry=self.entry, user=self.user, action='calculate_interest',
+            details='Interest calculated with rate 0.0378% for 30 days',
+        )
+        AuditLog.objects.create(
+            entry=self.entry, user=self.user, action='calculate_interest',
+            details='Interest calculated with rate 0.0356% for 30 days',
+        )
+        call_command('backfill_audit_payload', stdout=StringIO())
+        self.assertEqual(self.annual_rates(), ['12', '13.8', '12.9940'])
+        payload = AuditLog.objects.order_by('pk').first().payload
+        self.assertEqual(
+            (payload['amount'], payload['interest_amount'], payload['daily_rate']), ('1000.00', '9.87', '0.0329')
+        )
+
+
+class DashboardFeedTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='pw', is_staff=True, is_approved=True)
+        self.entry = make_entry(self.user, 'SN1')
+
+    def log(self):
+        return AuditLog.objects.create(entry=self.entry, user=self.user, action='edit', details='Entry edited').id
+
+    async def activity(self, feed, queue, polls=3):
+        """Ids of the activity events queued over a few polls"""
+        await asyncio.sleep(feed.poll_interval * polls)
+        ids = []
+        while not queue.empty():
+            event, data, event_id = queue.get_nowait()
+            if event == 'activity':
+                ids.append(event_id)
+        return ids
+
+    def test_stream_starts_after_the_rendered_id(self):
+        feed = DashboardFeed()
+        feed.poll_interval = 0.05
+        log = sync_to_async(self.log)
+
+        async def scenario():
+            first, second = await log(), await log()
+            queue = feed.subscribe(after=first)
+            self.assertEqual(await self.activity(feed, queue), [second])
+            feed.unsubscribe(queue)
+            await feed.task
+
+            # Written while nobody watched; a page rendered after them already shows them
+            await log()
+            shown = await log()
+            queue = feed.subscribe(after=shown)
+            latest = feed.subscribe()
+            await asyncio.sleep(feed.poll_interval * 2)
+            third = await log()
+            self.assertEqual(await self.activity(feed, queue), [third])
+            self.assertEqual(await self.activity(feed, latest, polls=0), [third])
+            feed.unsubscribe(queue)
+            feed.unsubscribe(latest)
+            await feed.task
+            await feed.close()
+
+        async_to_sync(scenario)()
+
+    def test_row_committed_below_the_cursor_is_sent_once(self):
+        feed = DashboardFeed()
+        feed.poll_interval = 0.05
+        gap = self.log()
+        AuditLog.objects.filter(id=gap).delete()
+
+        async def scenario():
+            shown = await sync_to_async(self.log)()
+            queue = feed.subscribe(after=shown)
+            self.assertEqual(await self.activity(feed, queue), [])
+            # A slow transaction commits the id it was given before `shown`
+            await sync_to_async(AuditLog.objects.create)(
+                id=gap, entry=self.entry, user=self.user, action='release', details='Entry released'
+            )
+            self.assertEqual(await self.activity(feed, queue), [gap])
+            self.assertEqual(await self.activity(feed, queue), [])
+            feed.unsubscribe(queue)
+            await feed.task
+            await feed.close()
+
+        async_to_sync(scenario)()
+
+    def test_subscribing_while_a_poll_is_in_flight(self):
+        feed = DashboardFeed()
+        feed.poll_interval = 0.05
+        log = sync_to_async(self.log)
+        db = feed._db
+        joined = []
+
+        def joining_db(func, *args):
+            # Clients connect while each of the first polls awaits the database
+            if len(joined) < 4:
+                joined.append(feed.subscribe(after=first if len(joined) % 2 else None))
+            return db(func, *args)
+
+        async def scenario():
+            nonlocal first
+            first = await log()
+            queue = feed.subscribe(after=first)
+            feed._db = joining_db
+            await asyncio.sleep(feed.poll_interval * 4)
+            second = await log()
+            self.assertEqual(await self.activity(feed, queue), [second])
+            self.assertEqual([await self.activity(feed, client, polls=0) for client in joined], [[second]] * 4)
+            for client in (queue, *joined):
+                feed.unsubscribe(client)
+            await feed.task
+            await feed.close()
+
+        first = None
+        with self.assertNoLogs('entries.live', 'ERROR'):
+            async_to_sync(scenario)()
+
+
+class PortfolioReplayTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teller', password='pw', is_approved=True)
+
+    def full_replay(self, moment):
+        """portfolio_as_of(moment) replayed from the first event, without snapshots"""
+        with patch.object(PortfolioSnapshot.objects, 'filter', return_value=PortfolioSnapshot.objects.none()):
+            return portfolio_as_of(moment)[:2]
+
+    def test_snapshot_plus_replay_matches_full_replay(self):
+        rng = random.Random(20251019)
+        entries, moments = [], []
+        for step in range(60):
+            action = rng.random()
+            active = [entry for entry in entries if entry.status == 'active']
+            if action < 0.4 or not active:
+                entry = make_entry(self.user, f'SN{step}', amount=Decimal(rng.randrange(100, 5000)))
+                AuditLog.record(entry, self.user, 'create', 'Entry created')
+                entries.append(entry)
+            elif action < 0.6:
+                Entry.record_interest_many([rng.choice(active).pk], Decimal('0.0329'), None, self.user)
+            elif action < 0.8:
+                Entry.release_many([rng.choice(active).pk], self.user)
+            else:
+                take_snapshot()
+            for entry in entries:
+                entry.refresh_from_db()
+            moments.append(timezone.now())
+
+        self.assertTrue(PortfolioSnapshot.objects.exists())
+        for moment in moments:
+            self.assertEqual(portfolio_as_of(moment)[:2], self.full_replay(moment))
+        active = {str(entry.pk) for entry in entries if entry.status == 'active'}
+        self.assertEqual(set(portfolio_as_of(timezone.now())[0]), active)
+
+    def test_admin_changes_are_replayed(self):
+        admin_user = User.objects.create_superuser('admin', password='pw', is_approved=True)
+        self.client.force_login(admin_user)
+        entries = [make_entry(self.user, f'SN{i}') for i in range(4)]
+        for entry in entries:
+            AuditLog.record(entry, self.user, 'create', 'Entry created')
+        take_snapshot()
+
+        def change(entry, **fields):
+            data = {
+                'serial_number': entry.serial_number, 'customer_name': entry.customer_name,
+                'date': entry.date, 'amount': entry.amount, 'weight': entry.weight, 'status': entry.status,
+                'interest_rate': '', 'interest_amount': '', 'user': entry.user_id,
+            }
+            data.update(fields)
+            response = self.client.post(reverse('admin:entries_entry_change', args=[entry.pk]), data)
+            self.assertEqual(response.status_code, 302)
+
+        change(entries[0], amount='2500.00')
+        change(entries[1], status='removed')
+        self.client.post(reverse('admin:entries_entry_delete', args=[entries[2].pk]), {'post': 'yes'})
+        self.client.post(reverse('admin:entries_entry_changelist'), {
+            'action': 'delete_selected', '_selected_action': [entries[3].pk], 'post': 'yes',
+        })
+
+        book = {
+            str(row['pk']): audit_state_from_values(row)
+            for row in Entry.objects.filter(status='active').values('pk', *AUDIT_FIELDS)
+        }
+        self.assertEqual(set(book), {str(entries[0].pk)})
+        entries_as_of, totals = portfolio_as_of(timezone.now())[:2]
+        self.assertEqual(entries_as_of, book)
+        self.assertEqual(totals['active_principal'], Decimal('2500.00'))
+        self.assertEqual(AuditLog.objects.filter(action='delete', entry=None).count(), 2)
+
+    def test_event_committed_below_the_snapshot_mark_is_replayed(self):
+        entry = make_entry(self.user, 'SN1')
+        AuditLog.record(entry, self.user, 'create', 'Entry created')
+        # A bulk release takes an id, and commits only after the snapshot reads past it
+        gap = AuditLog.objects.create(entry=entry, user=self.user, action='edit').id
+        AuditLog.objects.filter(id=gap).delete()
+        AuditLog.record(make_entry(self.user, 'SN2'), self.user, 'create', 'Entry created')
+        snapshot = take_snapshot()
+        self.assertGreater(snapshot.last_audit_id, gap)
+
+        before = entry.audit_state()
+        entry.release()
+        AuditLog.objects.create(
+            id=gap, entry=entry, user=self.user, action='release',
+            payload=AuditLog.build_payload(before, entry.audit_state()),
+        )
+        entries, totals = portfolio_as_of(timezone.now())[:2]
+        self.assertNotIn(str(entry.pk), entries)
+        self.assertEqual(totals['active_loans'], 1)
+        self.assertEqual((entries, totals), self.full_replay(timezone.now()))
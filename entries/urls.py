@@ -7,7 +7,15 @@ urlpatterns = [
     path('entry/<int:pk>/edit/', views.entry_edit, name='entry_edit'),
     path('entry/<int:pk>/calculate-interest/', views.calculate_interest, name='calculate_interest'),
     path('entry/<int:pk>/release/', views.release_entry, name='release_entry'),
+    path('entry/bulk/release/', views.bulk_release, name='bulk_release'),
+    path('entry/bulk/calculate-interest/', views.bulk_calculate_interest, name='bulk_calculate_interest'),
+    path('entry/sync/', views.sync_batch, name='sync_batch'),
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/dashboard/events/', views.dashboard_events, name='dashboard_events'),
     path('admin/released-entries/', views.released_entries, name='released_entries'),
+    path('admin/customers/', views.customer_list, name='customer_list'),
+    path('admin/customers/<int:pk>/', views.customer_detail, name='customer_detail'),
+    path('admin/portfolio/', views.portfolio, name='portfolio'),
     path('admin/export/', views.export_to_excel, name='export_to_excel'),
+    path('admin/reports/', views.entry_reports, name='entry_reports'),
 ] 
\ No newline at end of file
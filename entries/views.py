@@ -1,17 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.middleware.csrf import CsrfViewMiddleware
+from functools import wraps
 from django.contrib import messages
+from django.db import IntegrityError
 from django.db.models import Sum, Count
 from django.utils import timezone
-from .models import Entry, AuditLog
-from .forms import EntryForm, InterestCalculationForm, EntryFilterForm
+from .models import Entry, AllEntry, AuditLog, Customer, MaturityAlert, MaturityScan
+from .forms import EntryForm, InterestCalculationForm, EntryFilterForm, PortfolioDateForm, ReportFilterForm
+from . import reports, rows, sync
+from .portfolio import end_of_day, portfolio_as_of
+from .live import dashboard_counters, feed
 from users.views import is_approved_user
 from django.db.models import Q
 from decimal import Decimal
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import datetime
+import asyncio
+import json
 
 @login_required
 @user_passes_test(is_approved_user)
@@ -22,12 +31,7 @@ def entry_create(request):
             entry = form.save(commit=False)
             entry.user = request.user
             entry.save()
-            AuditLog.objects.create(
-                entry=entry,
-                user=request.user,
-                action='create',
-                details='Entry created'
-            )
+            AuditLog.record(entry, request.user, 'create', 'Entry created')
             messages.success(request, 'Entry created successfully!')
             return redirect('entry_list')
     else:
@@ -38,22 +42,22 @@ def entry_create(request):
 @user_passes_test(is_approved_user)
 def entry_list(request):
     entries = Entry.objects.filter(user=request.user, status='active')
-    return render(request, 'entries/entry_list.html', {'entries': entries})
+    return render(request, 'entries/entry_list.html', {
+        'entries': rows.project(entries, rows.ENTRY_LIST),
+        'interest_form': InterestCalculationForm(),
+    })
 
 @login_required
 @user_passes_test(is_approved_user)
 def entry_edit(request, pk):
     entry = get_object_or_404(Entry, pk=pk, user=request.user, status='active')
+    # Validation updates the instance, so capture the audited state first
+    before = entry.audit_state()
     if request.method == 'POST':
         form = EntryForm(request.POST, instance=entry)
         if form.is_valid():
             form.save()
-            AuditLog.objects.create(
-                entry=entry,
-                user=request.user,
-                action='edit',
-                details='Entry edited'
-            )
+            AuditLog.record(entry, request.user, 'edit', 'Entry edited', before)
             messages.success(request, 'Entry updated successfully!')
             return redirect('entry_list')
     else:
@@ -75,6 +79,7 @@ def calculate_interest(request, pk):
         if request.method == 'POST':
             form = InterestCalculationForm(request.POST)
             if form.is_valid():
+                before = entry.audit_state()
                 daily_rate = form.cleaned_data['daily_rate']
                 to_date = form.cleaned_data['to_date']
                 
@@ -87,23 +92,27 @@ def calculate_interest(request, pk):
                 days = (entry.to_date - entry.from_date).days
                 interest_type = "Compound" if days >= 365 else "Simple"
                 
+                entry.interest_rate = daily_rate
+                entry.interest_amount = interest_amount
+                entry.save()
+                # total_amount is computed by the database; a saved instance keeps the old value
+                entry.refresh_from_db(fields=['total_amount'])
+
                 calculation_result = {
                     'daily_rate': daily_rate,
                     'days': days,
                     'interest_type': interest_type,
                     'interest_amount': interest_amount,
-                    'total_amount': entry.amount + interest_amount
+                    'total_amount': entry.total_amount
                 }
                 
-                entry.interest_rate = daily_rate
-                entry.interest_amount = interest_amount
-                entry.save()
-                
-                AuditLog.objects.create(
-                    entry=entry,
-                    user=request.user,
-                    action='calculate_interest',
-                    details=f'Interest calculated with rate {daily_rate}% for {days} days'
+                AuditLog.record(
+                    entry,
+                    request.user,
+                    'calculate_interest',
+                    f'Interest calculated with rate {daily_rate}% for {days} days',
+                    before,
+                    **AuditLog.interest_payload(daily_rate, days, form.cleaned_data['annual_rate']),
                 )
                 messages.success(request, 'Interest calculated successfully!')
         else:
@@ -122,30 +131,107 @@ def calculate_interest(request, pk):
 @user_passes_test(is_approved_user)
 def release_entry(request, pk):
     entry = get_object_or_404(Entry, pk=pk, user=request.user, status='active')
+    before = entry.audit_state()
     entry.release()
-    AuditLog.objects.create(
-        entry=entry,
-        user=request.user,
-        action='release',
-        details='Entry released'
-    )
+    AuditLog.record(entry, request.user, 'release', 'Entry released', before)
     messages.success(request, 'Entry released successfully!')
     return redirect('entry_list')
 
+def _selected_ids(request):
+    return [pk for pk in request.POST.getlist('selected') if pk.isdigit()]
+
+def _report_bulk_result(request, verb, done, skipped):
+    if done:
+        messages.success(request, f'{len(done)} entries {verb} successfully!')
+    if skipped:
+        messages.warning(
+            request,
+            f'Skipped entries that are not active or not yours: {", ".join(str(pk) for pk in skipped)}'
+        )
+
+@login_required
+@user_passes_test(is_approved_user)
+@require_POST
+def bulk_release(request):
+    ids = _selected_ids(request)
+    if not ids:
+        messages.error(request, 'Please select at least one entry.')
+        return redirect('entry_list')
+    released, skipped = Entry.release_many(ids, request.user, Entry.objects.filter(user=request.user))
+    _report_bulk_result(request, 'released', released, skipped)
+    return redirect('entry_list')
+
+@login_required
+@user_passes_test(is_approved_user)
+@require_POST
+def bulk_calculate_interest(request):
+    ids = _selected_ids(request)
+    form = InterestCalculationForm(request.POST)
+    if not ids:
+        messages.error(request, 'Please select at least one entry.')
+        return redirect('entry_list')
+    if not form.is_valid():
+        messages.error(request, 'Please choose a valid interest rate.')
+        return redirect('entry_list')
+    updated, skipped = Entry.record_interest_many(
+        ids,
+        form.cleaned_data['daily_rate'],
+        form.cleaned_data['to_date'],
+        request.user,
+        Entry.objects.filter(user=request.user),
+        form.cleaned_data['annual_rate'],
+    )
+    _report_bulk_result(request, 'updated with interest', updated, skipped)
+    return redirect('entry_list')
+
+class _CsrfCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return reason
+
+def _device_api(view):
+    """
+    For JSON endpoints used by branch devices: a missing or unapproved login
+    is a JSON 401/403 rather than a redirect to the login page, and the CSRF
+    check runs here so its failure is JSON too (see entries.sync).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        if not is_approved_user(request.user):
+            return JsonResponse({'error': 'Your account is not approved.'}, status=403)
+        check = _CsrfCheck(lambda request: None)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            return JsonResponse({'error': f'CSRF check failed: {reason}'}, status=403)
+        return view(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
+
+@require_POST
+@_device_api
+def sync_batch(request):
+    """Apply a JSON batch of create/interest/release operations from a branch device (see entries.sync)"""
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    try:
+        results = sync.apply_batch(request.user, body.get('operations') if isinstance(body, dict) else None)
+    except sync.BatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except IntegrityError:
+        return JsonResponse({'error': 'The batch overlapped a retry still in progress; send it again.'}, status=409)
+    return JsonResponse({'results': results})
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def admin_dashboard(request):
     form = EntryFilterForm(request.GET)
-    entries = Entry.objects.all()
+    entries = AllEntry.objects.all()
 
     # Stats should always reflect all entries, not filtered
-    stats = {
-        'total_entries': Entry.objects.count(),
-        'active_entries': Entry.objects.filter(status='active').count(),
-        'released_entries': Entry.objects.filter(status='released').count(),
-        'total_principal': Entry.objects.aggregate(Sum('amount'))['amount__sum'] or 0,
-        'total_interest': Entry.objects.aggregate(Sum('interest_amount'))['interest_amount__sum'] or 0,
-    }
+    stats = dashboard_counters()
 
     # Only filter for table display
     if form.is_valid():
@@ -157,25 +243,78 @@ def admin_dashboard(request):
             entries = entries.filter(date__lte=form.cleaned_data['date_to'])
         if form.cleaned_data['customer_name']:
             entries = entries.filter(customer_name__icontains=form.cleaned_data['customer_name'])
+        if form.cleaned_data['total_min'] is not None:
+            entries = entries.filter(total_amount__gte=form.cleaned_data['total_min'])
+        if form.cleaned_data['total_max'] is not None:
+            entries = entries.filter(total_amount__lte=form.cleaned_data['total_max'])
+        if form.cleaned_data['order_by']:
+            entries = entries.order_by(form.cleaned_data['order_by'], '-id')
+
+    audit_logs = list(AuditLog.objects.select_related('user').order_by('-timestamp')[:50])
 
-    audit_logs = AuditLog.objects.all().order_by('-timestamp')[:50]
+    # Maturity worklist is precomputed by the scan_maturities command
+    alerts = MaturityAlert.objects.filter(entry__status='active')
+    maturity_counts = dict(alerts.values_list('kind').annotate(count=Count('id')).order_by())
+    maturity_worklist = alerts.exclude(kind='due').select_related(
+        'entry', 'entry__user'
+    ).order_by('trigger_date')[:50]
+    last_scan = MaturityScan.objects.order_by('-scanned_through', '-started_at').first()
 
     return render(request, 'entries/admin_dashboard.html', {
-        'entries': entries,
+        'entries': rows.project(entries, rows.DASHBOARD),
         'total_entries': stats['total_entries'],
         'active_entries': stats['active_entries'],
         'released_entries': stats['released_entries'],
         'total_principal': stats['total_principal'],
         'total_interest': stats['total_interest'],
         'recent_activity': audit_logs,
+        'latest_audit_id': max((log.id for log in audit_logs), default=0),
+        'due_count': maturity_counts.get('due', 0),
+        'approaching_count': maturity_counts.get('approaching', 0),
+        'overdue_count': maturity_counts.get('overdue', 0),
+        'maturity_worklist': maturity_worklist,
+        'last_scan': last_scan,
         'form': form
     })
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+async def dashboard_events(request):
+    """Server-Sent Events stream of new activity and changed statistics for admin_dashboard."""
+    # The page passes the newest audit id it rendered; on reconnect the
+    # browser sends the last event id it received instead
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after', '')
+    queue = feed.subscribe(int(after) if after.isdigit() else None)
+
+    async def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message is None:
+                    return
+                event, data, event_id = message
+                frame = f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+                if event_id is not None:
+                    frame = f'id: {event_id}\n' + frame
+                yield frame
+        finally:
+            feed.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def released_entries(request):
     search_query = request.GET.get('search', '')
-    entries = Entry.objects.filter(status='released')
+    entries = AllEntry.objects.filter(status='released')
     
     if search_query:
         entries = entries.filter(
@@ -185,10 +324,72 @@ def released_entries(request):
         )
     
     return render(request, 'entries/released_entries.html', {
-        'entries': entries,
+        'entries': rows.project(entries, rows.RELEASED),
+        'search_query': search_query
+    })
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def customer_list(request):
+    search_query = request.GET.get('search', '')
+    customers = Customer.objects.all()
+
+    if search_query:
+        customers = customers.filter(normalized_name__startswith=Customer.normalize_name(search_query))
+
+    active = Q(entry__status='active')
+    customers = customers.annotate(
+        active_loans=Count('entry', filter=active),
+        outstanding_principal=Sum('entry__amount', filter=active),
+    ).order_by('normalized_name')[:100]
+
+    return render(request, 'entries/customer_list.html', {
+        'customers': customers,
         'search_query': search_query
     })
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def customer_detail(request, pk):
+    customer = get_object_or_404(Customer, pk=pk)
+
+    # Active loans are never archived, so the live table's (customer, status) index covers them
+    outstanding = Entry.objects.filter(customer=customer, status='active').aggregate(
+        active_loans=Count('id'),
+        outstanding_principal=Sum('amount'),
+        gold_weight=Sum('weight'),
+    )
+    history = AllEntry.objects.filter(customer=customer)
+    totals = history.aggregate(total_loans=Count('id'), total_principal=Sum('amount'))
+
+    return render(request, 'entries/customer_detail.html', {
+        'customer': customer,
+        'active_loans': outstanding['active_loans'],
+        'outstanding_principal': outstanding['outstanding_principal'] or 0,
+        'gold_weight': outstanding['gold_weight'] or 0,
+        'total_loans': totals['total_loans'],
+        'total_principal': totals['total_principal'] or 0,
+        'entries': history.select_related('user').order_by('-date'),
+    })
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def portfolio(request):
+    form = PortfolioDateForm(request.GET or None)
+    context = {'form': form}
+
+    if form.is_valid():
+        as_of = form.cleaned_data['as_of']
+        entries, totals, snapshot = portfolio_as_of(end_of_day(as_of))
+        context.update(totals)
+        context.update({
+            'as_of': as_of,
+            'snapshot': snapshot,
+            'entries': sorted(entries.values(), key=lambda state: (state['date'], state['serial_number'])),
+        })
+
+    return render(request, 'entries/portfolio.html', context)
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def export_to_excel(request):
@@ -198,8 +399,8 @@ def export_to_excel(request):
     date_to = request.GET.get('date_to')
     search_query = request.GET.get('search', '')
     
-    # Base queryset
-    entries = Entry.objects.all()
+    # Base queryset, including archived entries
+    entries = AllEntry.objects.all()
     
     # Apply filters
     if status != 'all':
@@ -215,66 +416,39 @@ def export_to_excel(request):
             Q(user__username__icontains=search_query)
         )
     
-    # Create a new workbook and select the active sheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Entries Report"
-    
-    # Define styles
-    header_font = Font(bold=True)
-    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-    
-    # Write headers
-    headers = [
-        'Date', 'User', 'Serial Number', 'Customer Name', 'Amount', 
-        'Weight', 'Status', 'Interest Rate', 'Interest Amount', 
-        'Total Amount', 'Created At', 'Updated At'
-    ]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Write data
-    for row, entry in enumerate(entries, 2):
-        # Convert timezone-aware datetimes to naive datetimes
-        created_at = entry.created_at.replace(tzinfo=None) if entry.created_at else None
-        updated_at = entry.updated_at.replace(tzinfo=None) if entry.updated_at else None
-        
-        ws.cell(row=row, column=1, value=entry.date)
-        ws.cell(row=row, column=2, value=entry.user.username)
-        ws.cell(row=row, column=3, value=entry.serial_number)
-        ws.cell(row=row, column=4, value=entry.customer_name)
-        ws.cell(row=row, column=5, value=float(entry.amount))
-        ws.cell(row=row, column=6, value=float(entry.weight))
-        ws.cell(row=row, column=7, value=entry.status)
-        ws.cell(row=row, column=8, value=float(entry.interest_rate) if entry.interest_rate else None)
-        ws.cell(row=row, column=9, value=float(entry.interest_amount) if entry.interest_amount else None)
-        ws.cell(row=row, column=10, value=float(entry.amount + entry.interest_amount) if entry.interest_amount else float(entry.amount))
-        ws.cell(row=row, column=11, value=created_at)
-        ws.cell(row=row, column=12, value=updated_at)
-    
-    # Adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    
     # Create the response
     response = HttpResponse(
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     response['Content-Disposition'] = f'attachment; filename=entries_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
     
-    # Save the workbook to the response
-    wb.save(response)
+    rows.write_export(entries, response)
+    return response
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def entry_reports(request):
+    form = ReportFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    date_from = form.cleaned_data['date_from']
+    date_to = form.cleaned_data['date_to']
+    names = [name for name in request.GET.getlist('report') if name in reports.REPORTS]
+
+    entries = AllEntry.objects.all()
+    if date_from:
+        entries = entries.filter(date__gte=date_from)
+    if date_to:
+        entries = entries.filter(date__lte=date_to)
+
+    results = reports.run_reports(entries, names)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse(results)
+
+    response = HttpResponse(
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename=entries_summary_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    reports.write_workbook(results, response)
     return response
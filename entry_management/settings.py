@@ -153,6 +153,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Cold-start budget for one web worker, enforced by `manage.py startup_profile --check`
+# and the test suite
+STARTUP_BUDGET = {
+    'seconds': float(os.environ.get('STARTUP_BUDGET_SECONDS', 3)),
+    'rss_mb': float(os.environ.get('STARTUP_BUDGET_RSS_MB', 120)),
+}
+
 # Login/Logout URLs
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
@@ -161,6 +168,37 @@ LOGIN_URL = 'login'
 # Custom User Model
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Sessions and the logged-in user are read from the cache. Sessions are still
+# written through to the database, so losing the cache logs nobody out;
+# `manage.py clear_expired_sessions` prunes that table.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
+# File-based, so every worker process on the host shares one cache and sees
+# the same invalidations, with no outside service to run
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Rendered table rows ({% cached_rows %}). Keys include the row's
+    # updated_at, so a per-process cache never serves a stale row, but
+    # superseded rows stay until culled. A dashboard row takes about 1 KB
+    # here, so this is roughly 10 MB per worker; when full, the least
+    # recently used third is dropped.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Tests swap the default cache for an in-memory one so they never read or
+# write the dev server's cache directory
+TEST_RUNNER = 'entry_management.test_runner.IsolatedCacheRunner'
+
 # PostgreSQL settings
 POSTGRESQL_SETTINGS = {
     'USER': 'postgres',
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class IsolatedCacheRunner(DiscoverRunner):
+    """
+    DiscoverRunner that swaps the on-disk default cache for a per-process
+    in-memory one, so cached users and sessions never pass between a test
+    run and the dev server (or between runs) through the shared cache
+    directory.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        caches = {**settings.CACHES, 'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tests',
+            'OPTIONS': settings.CACHES['default'].get('OPTIONS', {}),
+        }}
+        self._cache_override = override_settings(CACHES=caches)
+        self._cache_override.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._cache_override.disable()
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from .backends import invalidate_cached_user
+
+        # Covers approve_user, the admin and anything else that saves a user.
+        # QuerySet.update() sends no signal, so a user changed that way (say
+        # filter(...).update(is_active=False)) is served from the cache until
+        # USER_CACHE_TIMEOUT runs out: deactivate or unapprove through save().
+        user_model = self.get_model('CustomUser')
+        post_save.connect(invalidate_cached_user, sender=user_model, dispatch_uid='users.invalidate_cached_user')
+        post_delete.connect(invalidate_cached_user, sender=user_model, dispatch_uid='users.invalidate_cached_user_delete')
@@ -0,0 +1,41 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# Upper bound on how long a user row can be served from the cache; saves and
+# deletes invalidate it straight away, QuerySet.update() does not (see apps.py)
+USER_CACHE_TIMEOUT = 60 * 15
+
+
+def user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """post_save/post_delete receiver: drop the cached copy of a changed user"""
+    cache.delete(user_cache_key(instance.pk))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps each logged-in user, approval flag included, in
+    the cache, so login_required and is_approved_user cost no query.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
+
+    async def aget_user(self, user_id):
+        # ModelBackend.aget_user queries directly rather than calling get_user
+        key = user_cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(key, user, USER_CACHE_TIMEOUT)
+        return user
@@ -1,3 +1,65 @@
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from entries.testing import record_queries
+
+from .backends import CachedModelBackend
+from .models import CustomUser
+
+
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        self.staff = CustomUser.objects.create_user('staff', password='pw', is_staff=True, is_approved=True)
+        self.teller = CustomUser.objects.create_user('teller', password='pw', is_approved=True)
+
+    def auth_queries(self, url):
+        with record_queries() as log:
+            response = self.client.get(url)
+        tables = ('"django_session"', '"users_customuser"')
+        return response, [sql for sql, _ in log.queries if any(table in sql for table in tables)]
+
+    def test_teller_page_load_reads_no_session_or_user(self):
+        self.client.login(username='teller', password='pw')
+        self.client.get(reverse('entry_list'))
+        response, queries = self.auth_queries(reverse('entry_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_approval_change_is_seen_on_next_request(self):
+        pending = CustomUser.objects.create_user('pending', password='pw')
+        self.client.login(username='pending', password='pw')
+        self.assertEqual(self.client.get(reverse('entry_list')).status_code, 302)
+
+        staff_client = self.client_class()
+        staff_client.login(username='staff', password='pw')
+        staff_client.get(reverse('approve_user', args=[pending.pk]))
+        self.assertEqual(self.client.get(reverse('entry_list')).status_code, 200)
+
+        pending.is_approved = False
+        pending.save()
+        self.assertEqual(self.client.get(reverse('entry_list')).status_code, 302)
+
+    def test_async_lookup_uses_the_cache(self):
+        backend = CachedModelBackend()
+        self.assertEqual(async_to_sync(backend.aget_user)(self.teller.pk), self.teller)
+        with self.assertNumQueries(0):
+            user = async_to_sync(backend.aget_user)(self.teller.pk)
+        self.assertTrue(user.is_approved)
+
+        self.teller.is_approved = False
+        self.teller.save()
+        self.assertFalse(async_to_sync(backend.aget_user)(self.teller.pk).is_approved)
+
+    def test_deactivation_through_save_is_seen_on_next_request(self):
+        self.client.login(username='teller', password='pw')
+        self.assertEqual(self.client.get(reverse('entry_list')).status_code, 200)
+
+        self.teller.is_active = False
+        self.teller.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(reverse('entry_list')).status_code, 302)
+
+    def test_tests_do_not_share_the_on_disk_cache(self):
+        self.assertIsInstance(caches['default'], LocMemCache)